@@ -0,0 +1,196 @@
+import datetime as dt
+
+import numpy as np
+import pandas as pd
+
+from bonds.parser import get_board_snapshot
+
+# Цена в процентах от номинала: по порядку предпочтения, построчно.
+# PRICE - цена, по которой биржа считает доходность в marketdata_yields
+PRICE_COLUMNS = ("PRICE", "LAST", "WAPRICE", "PREVWAPRICE", "PREVPRICE")
+# Доходность биржи к той же цене (для сверки), %
+EXCHANGE_YIELDS = {
+    "PRICE": "EFFECTIVEYIELD",
+    "LAST": "YIELD",
+    "WAPRICE": "EFFECTIVEYIELDWAPRICE",
+    "PREVWAPRICE": "YIELDATPREVWAPRICE",
+}
+DAYS = 365.0
+MAX_ITER = 50
+TOL = 1e-10
+
+
+def _dates(df, column):
+    if column not in df.columns:
+        return pd.Series(pd.NaT, index=df.index, dtype="datetime64[ns]")
+    return pd.to_datetime(df[column], format="%Y-%m-%d", errors="coerce")
+
+
+def _numbers(df, column):
+    if column not in df.columns:
+        return np.full(len(df), np.nan)
+    return pd.to_numeric(df[column], errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+
+
+def _price(df):
+    """Цена (% номинала) и имя столбца, откуда она взята, построчно"""
+    price = np.full(len(df), np.nan)
+    source = np.full(len(df), None, dtype=object)
+    for column in PRICE_COLUMNS:
+        value = _numbers(df, column)
+        take = np.isnan(price) & (value > 0)
+        price[take] = value[take]
+        source[take] = column
+    return price, source
+
+
+def dirty_price(df):
+    """Грязная цена одной бумаги в валюте номинала, чистая цена (%) и ее источник"""
+    price, source = _price(df)
+    dirty = price / 100 * _numbers(df, "FACEVALUE") + np.nan_to_num(_numbers(df, "ACCRUEDINT"))
+    return dirty, price, source
+
+
+def settle_dates(df, settle=None):
+    """Дата расчетов по каждой бумаге: settle, иначе SETTLEDATE снимка (T+1,
+    к ней биржа считает доходность), иначе сегодня
+    """
+    if settle is not None:
+        return pd.Series(pd.Timestamp(settle), index=df.index)
+    return _dates(df, "SETTLEDATE").fillna(pd.Timestamp(dt.date.today()))
+
+
+def cash_flow_grid(df, settle=None, to_offer=True):
+    """Сетка денежных потоков (бумаги x выплаты) по полям блока securities.
+
+    Купон считается постоянным (COUPONVALUE) с шагом COUPONPERIOD дней от
+    NEXTCOUPON, номинал гасится в MATDATE (или OFFERDATE, если to_offer и
+    оферта раньше погашения). Дата расчетов - см. settle_dates.
+    Возвращает (times, flows, end): сроки в годах от даты расчетов, суммы
+    и дату последнего потока; пустые ячейки - 0.
+    """
+    settle = settle_dates(df, settle)
+    end = _dates(df, "MATDATE")
+    if to_offer:
+        offer = _dates(df, "OFFERDATE")
+        end = end.where(~(offer > settle) | ~(offer < end), offer)
+    end_days = (end - settle).dt.days.to_numpy(dtype=float, na_value=np.nan)
+    next_days = (_dates(df, "NEXTCOUPON") - settle).dt.days.to_numpy(dtype=float, na_value=np.nan)
+    period = _numbers(df, "COUPONPERIOD")
+    coupon = np.nan_to_num(_numbers(df, "COUPONVALUE"))
+    face = _numbers(df, "FACEVALUE")
+    # NEXTCOUPON в дату расчетов или раньше (день выплаты, ISS еще не сдвинул
+    # поле) - первым считается ближайший купон графика после даты расчетов
+    step = np.where(period > 0, period, np.nan)
+    next_days = np.where(next_days <= 0, next_days + (np.floor(-next_days / step) + 1) * step, next_days)
+
+    has_coupons = (period > 0) & (coupon > 0) & (next_days > 0) & (next_days <= end_days)
+    count = np.where(has_coupons, np.floor((end_days - next_days) / np.where(period > 0, period, 1)) + 1, 0)
+    count = count.astype(int)
+    width = max(int(count.max(initial=0)), 1)
+
+    # Выплата j - купон в next + j * period (последняя не позже погашения),
+    # в отдельном столбце - номинал в дату погашения
+    j = np.arange(width)
+    days = next_days[:, None] + j * np.nan_to_num(period)[:, None]
+    live = j < count[:, None]
+    days = np.where(live, np.minimum(days, end_days[:, None]), 0.0)
+    flows = np.where(live, coupon[:, None], 0.0)
+
+    times = np.concatenate([days, end_days[:, None]], axis=1) / DAYS
+    flows = np.concatenate([flows, face[:, None]], axis=1)
+    valid = (end_days > 0) & (face > 0)
+    times[~valid] = 0.0
+    flows[~valid] = 0.0
+    return times, flows, end.where(valid)
+
+
+def _pv(y, times, flows):
+    """Цена, первая и вторая производные по доходности (эффективной годовой)"""
+    log_v = -np.log1p(y)[:, None] * times
+    discounted = flows * np.exp(log_v)
+    pv = discounted.sum(axis=1)
+    d1 = -(discounted * times).sum(axis=1) / (1 + y)
+    d2 = (discounted * times * (times + 1)).sum(axis=1) / (1 + y) ** 2
+    return pv, d1, d2
+
+
+def solve_yield(dirty, times, flows):
+    """Эффективная доходность по грязной цене для всех бумаг сразу.
+
+    Ньютон с поддержкой отрезка [lo, hi]: шаг, уходящий за отрезок,
+    заменяется делением пополам, поэтому сходимость гарантирована.
+    """
+    n = len(dirty)
+    lo = np.full(n, -0.99)
+    hi = np.full(n, 10.0)
+    y = np.full(n, 0.1)
+    active = np.isfinite(dirty) & (dirty > 0) & (flows.sum(axis=1) > 0)
+    y[~active] = np.nan
+    for _ in range(MAX_ITER):
+        if not active.any():
+            break
+        idx = np.flatnonzero(active)
+        pv, d1, _ = _pv(y[idx], times[idx], flows[idx])
+        f = pv - dirty[idx]
+        # Цена убывает по доходности: f > 0 - доходность выше текущей
+        lo[idx] = np.where(f > 0, y[idx], lo[idx])
+        hi[idx] = np.where(f > 0, hi[idx], y[idx])
+        with np.errstate(divide="ignore", invalid="ignore"):
+            step = y[idx] - f / d1
+        inside = np.isfinite(step) & (step > lo[idx]) & (step < hi[idx])
+        new = np.where(inside, step, (lo[idx] + hi[idx]) / 2)
+        done = np.abs(new - y[idx]) < TOL
+        y[idx] = new
+        active[idx[done]] = False
+    y[active] = np.nan
+    return y
+
+
+def bond_analytics(df, settle=None, to_offer=True):
+    """Доходность, дюрация, выпуклость и DV01 по каждой бумаге снимка.
+
+    df - снимок get_board_snapshot (поля securities, marketdata и
+    marketdata_yields). Доходность - эффективная годовая, как у биржи,
+    в процентах; DV01 - изменение грязной цены одной бумаги (в валюте
+    номинала) при сдвиге доходности на 1 б.п.
+    """
+    times, flows, end = cash_flow_grid(df, settle, to_offer)
+    dirty, price, source = dirty_price(df)
+
+    y = solve_yield(dirty, times, flows)
+    ok = np.isfinite(y)
+    pv, d1, d2 = _pv(np.where(ok, y, 0.0), times, flows)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        macaulay = -d1 * (1 + y) / pv
+        modified = -d1 / pv
+        convexity = d2 / pv
+    dv01 = modified * dirty * 1e-4
+
+    exchange = np.full(len(df), np.nan)
+    for column, yield_column in EXCHANGE_YIELDS.items():
+        take = source == column
+        exchange[take] = _numbers(df, yield_column)[take]
+
+    result = pd.DataFrame({
+        "price": price,
+        "price_source": source,
+        "dirty_price": dirty,
+        "end_date": end.to_numpy(),
+        "ytm": y * 100,
+        "exchange_yield": exchange,
+        "duration_days": macaulay * DAYS,
+        "modified_duration": modified,
+        "convexity": convexity,
+        "dv01": dv01,
+    }, index=df.index)
+    result.loc[~ok, ["duration_days", "modified_duration", "convexity", "dv01"]] = np.nan
+    return result
+
+
+def market_analytics(board=None, settle=None, to_offer=True):
+    """Аналитика по всему рынку облигаций (или одной доске) одним запросом"""
+    df = get_board_snapshot(board)
+    if df is None:
+        return None
+    return bond_analytics(df, settle, to_offer)
@@ -0,0 +1,232 @@
+import datetime as dt
+import json
+
+import numpy as np
+import pandas as pd
+
+from bonds.analytics import DAYS, cash_flow_grid, dirty_price, settle_dates, solve_yield
+from bonds.parser import get_board_snapshot
+from iss.cache import CACHE_DIR
+
+# Параметры Нельсона-Сигеля-Свенссона по датам: {"ГГГГ-ММ-ДД": [b0, b1, b2, b3, tau1, tau2]}
+PARAMS_PATH = CACHE_DIR / "gcurve.json"
+PARAMS = ("beta0", "beta1", "beta2", "beta3", "tau1", "tau2")
+# Кривая строится по ОФЗ-ПД (постоянный купон); флоатеры и линкеры искажают ее
+FIXED_PREFIXES = ("SU25", "SU26")
+MIN_YEARS = 0.25
+MAX_ITER = 100
+TOL = 1e-10
+
+
+def loadings(t, tau1, tau2):
+    """Нагрузки NSS (..., 4) для сроков t в годах"""
+    t = np.asarray(t, dtype=float)
+    out = np.empty(t.shape + (4,))
+    out[..., 0] = 1.0
+    for k, tau in ((1, tau1), (3, tau2)):
+        x = t / tau
+        small = x < 1e-8
+        e = np.exp(-x)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            f = np.where(small, 1.0, (1 - e) / x)
+        out[..., k] = f
+        if k == 1:
+            out[..., 2] = np.where(small, 0.0, f - e)
+        else:
+            out[..., 3] = np.where(small, 0.0, f - e)
+    return out
+
+
+def zero_rates(t, params):
+    """Безрисковые ставки (непрерывное начисление, доли) на сроки t"""
+    params = np.asarray(params, dtype=float)
+    return loadings(t, params[4], params[5]) @ params[:4]
+
+
+def _model(x, times, flows):
+    """Цены бумаг по кривой и их производные по beta; x - параметры с log(tau)"""
+    params = np.concatenate([x[:4], np.exp(x[4:])])
+    load = loadings(times, params[4], params[5])
+    discounted = flows * np.exp(-(load @ params[:4]) * times)
+    prices = discounted.sum(axis=1)
+    d_beta = -np.einsum("ij,ijk->ik", discounted * times, load)
+    return prices, d_beta
+
+
+def fit_nss(times, flows, dirty, x0=None, max_iter=MAX_ITER):
+    """Подгонка NSS по грязным ценам методом Левенберга-Марквардта.
+
+    Невязки - ошибки цен, деленные на ценовую дюрацию (то есть в б.п.
+    доходности); все бумаги оцениваются одной матричной операцией на
+    итерацию. x0 - стартовые параметры (например, вчерашние).
+    Возвращает (params, rmse_bp, iterations).
+    """
+    weights = flows.sum(axis=1)
+    duration = (flows * times).sum(axis=1) / np.where(weights > 0, weights, 1)
+    scale = 1e4 / (dirty * np.maximum(duration, 1 / DAYS))
+
+    if x0 is None:
+        # Концы кривой - по бумагам с найденной доходностью (у неликвидных ее может не быть)
+        y = np.log1p(solve_yield(dirty, times, flows))
+        known = np.where(np.isfinite(y), duration, np.nan)
+        if np.isnan(known).all():
+            short = long = 0.1
+        else:
+            short, long = y[np.nanargmin(known)], y[np.nanargmax(known)]
+        x0 = (long, short - long, 0.0, 0.0, 1.0, 5.0)
+    x = np.asarray(x0, dtype=float).copy()
+    x[4:] = np.log(x[4:])
+
+    def residuals(x):
+        prices, d_beta = _model(x, times, flows)
+        return (prices - dirty) * scale, d_beta * scale[:, None]
+
+    r, j_beta = residuals(x)
+    cost = r @ r
+    mu = 1e-3
+    for iteration in range(1, max_iter + 1):
+        # Производные по log(tau) - конечными разностями, по beta - аналитически
+        jac = np.empty((len(r), 6))
+        jac[:, :4] = j_beta
+        for k in (4, 5):
+            step = np.zeros(6)
+            step[k] = 1e-6
+            jac[:, k] = (residuals(x + step)[0] - r) / 1e-6
+        jtj = jac.T @ jac
+        grad = jac.T @ r
+        while True:
+            delta = np.linalg.solve(jtj + mu * np.diag(np.diag(jtj) + 1e-12), -grad)
+            candidate = x + delta
+            candidate[4:] = np.clip(candidate[4:], np.log(0.05), np.log(30.0))
+            r_new, j_new = residuals(candidate)
+            cost_new = r_new @ r_new
+            if np.isfinite(cost_new) and cost_new <= cost:
+                mu = max(mu / 3, 1e-12)
+                break
+            mu *= 4
+            if mu > 1e12:
+                break
+        if mu > 1e12:
+            break
+        improvement = cost - cost_new
+        x, r, j_beta, cost = candidate, r_new, j_new, cost_new
+        if improvement <= TOL * max(cost, 1.0) or np.abs(delta).max() < TOL:
+            break
+    params = np.concatenate([x[:4], np.exp(x[4:])])
+    return params, float(np.sqrt(cost / len(r))), iteration
+
+
+def ofz_universe(snapshot):
+    """ОФЗ с постоянным купоном из снимка TQOB"""
+    secid = snapshot["SECID"].astype(str)
+    return snapshot[secid.str.startswith(FIXED_PREFIXES)]
+
+
+def load_params(until=None, path=PARAMS_PATH):
+    """Последние сохраненные параметры на дату until или раньше (по умолчанию - любые)"""
+    if not path.exists():
+        return None
+    history = json.loads(path.read_text())
+    dates = sorted(d for d in history if until is None or d <= str(until))
+    return np.array(history[dates[-1]]) if dates else None
+
+
+def save_params(date, params, path=PARAMS_PATH):
+    history = json.loads(path.read_text()) if path.exists() else {}
+    history[str(date)] = [float(p) for p in params]
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(history, indent=1, sort_keys=True))
+
+
+class GCurve:
+    """Кривая бескупонной доходности ОФЗ (G-кривая) на дату расчетов"""
+
+    def __init__(self, params, settle=None, rmse_bp=None, iterations=None):
+        self.params = np.asarray(params, dtype=float)
+        self.settle = pd.Timestamp(settle or dt.date.today()).normalize()
+        self.rmse_bp = rmse_bp
+        self.iterations = iterations
+
+    def __repr__(self):
+        values = ", ".join(f"{n}={v:.4f}" for n, v in zip(PARAMS, self.params))
+        return f"GCurve({self.settle.date()}, {values}, rmse={self.rmse_bp} bp)"
+
+    @classmethod
+    def fit(cls, snapshot=None, settle=None, warm=True, save=True, x0=None, min_years=MIN_YEARS):
+        """Строит кривую по снимку TQOB (по умолчанию - загружает его).
+
+        settle по умолчанию - SETTLEDATE снимка (самая частая у ОФЗ).
+        warm=True - старт с последних сохраненных параметров на settle или
+        раньше (вчерашних либо утренних); переоценка внутри дня - несколько итераций.
+        """
+        snapshot = get_board_snapshot("TQOB") if snapshot is None else snapshot
+        if snapshot is None:
+            return None
+        ofz = ofz_universe(snapshot)
+        if settle is None and len(ofz):
+            settle = settle_dates(ofz).mode().iloc[0]
+        settle = pd.Timestamp(settle or dt.date.today()).normalize()
+        times, flows, _ = cash_flow_grid(ofz, settle, to_offer=False)
+        dirty = dirty_price(ofz)[0]
+        keep = np.isfinite(dirty) & (times.max(axis=1) >= min_years)
+        if keep.sum() < len(PARAMS):
+            print(f"Недостаточно ОФЗ для построения кривой: {keep.sum()}")
+            return None
+        if x0 is None and warm:
+            x0 = load_params(until=settle.date())
+        params, rmse, iterations = fit_nss(times[keep], flows[keep], dirty[keep], x0)
+        if save:
+            save_params(settle.date(), params)
+        return cls(params, settle, rmse, iterations)
+
+    def zero_rate(self, t):
+        """Ставка (непрерывное начисление, доли) на срок t лет"""
+        return zero_rates(t, self.params)
+
+    def yield_at(self, t):
+        """Эффективная годовая доходность кривой на срок t лет, %"""
+        return np.expm1(self.zero_rate(t)) * 100
+
+    def spreads(self, df, to_offer=True):
+        """Спреды бумаг снимка (например, TQCB) к кривой, б.п.
+
+        g_spread - доходность бумаги минус доходность кривой на ее дюрацию,
+        z_spread - параллельный сдвиг бескупонной кривой, дающий рыночную цену.
+        """
+        times, flows, _ = cash_flow_grid(df, self.settle, to_offer)
+        dirty = dirty_price(df)[0]
+        ytm = solve_yield(dirty, times, flows)
+
+        discounted = flows * np.exp(-self.zero_rate(times) * times)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            duration = (discounted * times).sum(axis=1) / discounted.sum(axis=1)
+        g_spread = (ytm - np.expm1(self.zero_rate(duration))) * 1e4
+
+        # z-спред: Ньютон по сдвигу s, цена монотонна по s
+        s = np.where(np.isfinite(ytm), np.log1p(ytm) - self.zero_rate(duration), np.nan)
+        for _ in range(50):
+            weight = discounted * np.exp(-s[:, None] * times)
+            price = weight.sum(axis=1)
+            slope = -(weight * times).sum(axis=1)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                step = (price - dirty) / slope
+            s = s - step
+            if not (np.abs(step[np.isfinite(step)]) > 1e-12).any():
+                break
+
+        return pd.DataFrame({
+            "ytm": ytm * 100,
+            "duration_years": duration,
+            "curve_yield": self.yield_at(duration),
+            "g_spread_bp": g_spread,
+            "z_spread_bp": s * 1e4,
+        }, index=df.index)
+
+
+def corporate_spreads(board="TQCB", curve=None):
+    """Спреды всех бумаг доски к G-кривой (кривая строится, если не передана)"""
+    curve = curve or GCurve.fit()
+    snapshot = get_board_snapshot(board)
+    if curve is None or snapshot is None:
+        return None
+    return curve.spreads(snapshot)
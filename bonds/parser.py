@@ -1,68 +1,117 @@
 
-import time
-import requests
 import pandas as pd
 
+from iss.boards import security_url
+from iss.pages import iter_listing, iter_pages, to_frame
+from iss.policy import IssError
+from iss.projection import get_blocks, records
+
 
 # Настройки pandas для отображения всех столбцов
 pd.set_option('display.max_columns', None)
 pd.set_option('display.width', 200)
 
-def get_moex_bonds(market):
-    """Функия получения данных от API Мсбиржи"""
-    # Получаем данные по указанному рынку (расширенный формат)
-    # Максимальное число получаемых записей в одном запросе - 100
-    # Получаем данные построчно, пока не закончатся данные по рынку
-    # Если результат пустой, возвращаем None
-
+def iter_moex_bonds(market, parallel=False, max_concurrency=8, as_arrow=False, columns=None):
+    """Генератор листинга по рынку (см. iss.pages.iter_listing)"""
     # Формат URL для получения данных от API Мосбиржи:
     # https://iss.moex.com/iss/securities.json?engine=stock&market={market}
-    # engine - указывает вид торговых операций
-    url = f"https://iss.moex.com/iss/securities.json?engine=stock&market={market}"
-    all_data = []
-    start = 0
-
-    while True:
-        try:
-            response = requests.get(f"{url}&start={start}", timeout=30)
-            # timeout=30 выбран опытным путем
-            data = response.json()
-        except requests.exceptions.RequestException as e:
-            print(f"Ошибка подключения:  - выключи vpn {e}")
-            time.sleep(5)  # Пауза перед повтором
-            continue
+    return iter_listing(market, parallel=parallel, max_concurrency=max_concurrency,
+                        as_arrow=as_arrow, columns=columns)
 
-        columns = data.get('securities').get('columns')
-        rows = data.get('securities').get('data')
-        # выход из цикла
-        if not rows:
-            break
-        # добавляем полученные данные в общий список
-        all_data.extend(rows)
-        start += 100
 
-    if not all_data:
+def get_moex_bonds(market, parallel=False, max_concurrency=8, columns=None):
+    """Функия получения данных от API Мсбиржи"""
+    # Получаем данные по указанному рынку (расширенный формат)
+    # Максимальное число получаемых записей в одном запросе - 100
+    # Страницы отдает iter_moex_bonds, здесь они только склеиваются
+    # Если результат пустой, возвращаем None
+    # parallel=True - страницы запрашиваются одновременно (не более max_concurrency)
+    # columns - только нужные столбцы листинга
+    chunks = list(iter_moex_bonds(market, parallel, max_concurrency, columns=columns))
+    if not chunks:
         return None
 
-    df = pd.DataFrame(all_data, columns=columns)
+    df = pd.concat(chunks, ignore_index=True)
     return df
 
-def get_moex_bonds_urovni_stavok():
+def get_moex_bonds_urovni_stavok(board="TQCB"):
     """Функия уровня ставок от кредитного рейтинга"""
-    for i in get_all_bond_tickers():
-        print(get_bond_details(i))
-
+    # Один запрос на всю доску вместо запроса на каждую бумагу
+    return get_board_snapshot(board)
+
+
+def get_board_snapshot(board="TQCB", market="bonds", engine="stock", columns=None):
+    """Снимок всех бумаг доски (или всего рынка, если board=None) одним запросом.
+
+    Блоки securities, marketdata и marketdata_yields объединяются по SECID
+    (и BOARDID для снимка рынка) в один DataFrame с индексом SECID.
+    columns - {блок: [столбцы]} для загрузки только части блоков и столбцов;
+    SECID и BOARDID добавляются сами.
+    """
+    if board:
+        url = f"https://iss.moex.com/iss/engines/{engine}/markets/{market}/boards/{board}/securities.json"
+    else:
+        url = f"https://iss.moex.com/iss/engines/{engine}/markets/{market}/securities.json"
+    if columns is None:
+        columns = {"securities": None, "marketdata": None, "marketdata_yields": None}
+    columns = {
+        block: None if names is None else list(dict.fromkeys(["SECID", "BOARDID", *names]))
+        for block, names in columns.items()
+    }
+    try:
+        data = get_blocks(url, columns)
+    except IssError as e:
+        print(f"Ошибка при получении данных для {board or market}: {e}")
+        return None
 
-def get_bond_details(s):
-    """вывод конкретной инфоррмации по конкретной бумаге"""
-    url = f"https://iss.moex.com/iss/engines/stock/markets/bonds/boards/TQCB/securities/{s}.json"
-    response = requests.get(url)
+    frames = {}
+    for block in ("securities", "marketdata", "marketdata_yields"):
+        part = data.get(block) or {}
+        frames[block] = pd.DataFrame(part.get("data", []), columns=part.get("columns", []))
 
-    if response.status_code != 200:
-        print(f"Ошибка при получении данных для {s}")
+    df = frames["securities"]
+    if df.empty:
+        print(f"Нет данных для {board or market}")
         return None
 
-    data = response.json()
+    keys = ["SECID", "BOARDID"]
+    for block in ("marketdata", "marketdata_yields"):
+        other = frames[block]
+        if other.empty:
+            continue
+        # Одноименные поля из marketdata/marketdata_yields получают суффикс блока
+        df = df.merge(other, on=[k for k in keys if k in other.columns],
+                      how="left", suffixes=("", f"_{block}"))
+
+    df = df.set_index("SECID", drop=False)
+    df.index.name = None
+    return df
+
+
+def get_bond_details(s, snapshot=None, board=None, columns=None):
+    """вывод конкретной инфоррмации по конкретной бумаге (columns - только эти столбцы)"""
+    # Если передан снимок доски (get_board_snapshot) - берем строку из него без запроса
+    if snapshot is not None:
+        if s not in snapshot.index:
+            print(f"Нет данных для {s}")
+            return None
+        row = snapshot.loc[[s]].reset_index(drop=True)
+        return row if columns is None else row[columns]
+
+    # Режим торгов (TQCB, TQOB, TQIR...) - из индекса iss.boards, если не указан явно;
+    # бумаги, которой нет на бирже, не запрашиваем
+    if board is None:
+        url = security_url(s)
+        if url is None:
+            print(f"Нет данных для {s}")
+            return None
+    else:
+        url = f"https://iss.moex.com/iss/engines/stock/markets/bonds/boards/{board}/securities/{s}.json"
+    try:
+        data = get_blocks(url, {"securities": columns})
+    except IssError as e:
+        print(f"Ошибка при получении данных для {s}: {e}")
+        return None
 
     columns = data['securities']['columns']
     rows = data['securities']['data']
@@ -78,45 +127,49 @@ def get_bond_details(s):
 
 
 
+def get_credit_rating(secid, policy=None):
+    """Кредитный рейтинг бумаги из description.json (None, если не указан)"""
+    # description.json - справочные данные, кэшируются на сутки (iss.cache)
+    url = f"https://iss.moex.com/iss/securities/{secid}/description.json"
+    data = get_blocks(url, {"description": ["name", "value"]}, timeout=10, policy=policy)
+    for row in records(data, "description"):
+        if row["name"].lower() in {"creditrating", "credit_rating"}:
+            return row["value"]
+    return None
+
+
+def get_bondization(secid, policy=None, force_refresh=False):
+    """Графики купонов и амортизаций бумаги из bondization.json.
+
+    Возвращает словарь {"coupons": DataFrame, "amortizations": DataFrame}
+    со столбцами ISS (coupondate/amortdate, value, valueprc, facevalue, faceunit).
+    """
+    # bondization.json кэшируется на сутки (iss.cache), limit=unlimited - весь график одной страницей
+    url = f"https://iss.moex.com/iss/securities/{secid}/bondization.json"
+    columns = {
+        "coupons": ["coupondate", "value", "valueprc", "facevalue", "faceunit"],
+        "amortizations": ["amortdate", "value", "valueprc", "facevalue", "faceunit"],
+    }
+    data = get_blocks(url, columns, params={"limit": "unlimited"}, timeout=10, policy=policy,
+                      force_refresh=force_refresh)
+    return {
+        block: pd.DataFrame(data.get(block, {}).get("data", []), columns=data.get(block, {}).get("columns", []))
+        for block in ("coupons", "amortizations")
+    }
+
+
 def get_all_bond_tickers():
     """Собирает все тикеры облигаций с MOEX (всех досок)"""
     base_url = "https://iss.moex.com/iss/securities.json"
     params = {
         "engine": "stock",
         "market": "bonds",
-        "iss.meta": "on",  # включаем метаданные
     }
 
     all_tickers = []
-    start = 0
-
-    while True:
-        try:
-            response = requests.get(base_url, params={**params, "start": start}, timeout=30)
-            data = response.json()
-        except requests.exceptions.RequestException as e:
-            print(f"Ошибка подключения: {e}")
-            time.sleep(5)
-            continue
-
-        securities = data.get("securities", {})
-        columns = securities.get("columns", [])
-        rows = securities.get("data", [])
 
-        if not rows:
-            break
-
-        # определяем индекс secid динамически
-        try:
-            secid_index = columns.index("secid")
-        except ValueError:
-            print(f"secid не найден в колонках: {columns}")
-            break
-
-        tickers = [row[secid_index] for row in rows if row[secid_index]]
-        all_tickers.extend(tickers)
-        start += 100
+    # Загружается только столбец secid; его наличие проверяется по метаданным ISS
+    for securities in iter_pages(base_url, params, columns=["secid"]):
+        all_tickers.extend(to_frame(securities)["secid"].dropna())
 
     return sorted(set(all_tickers))
-
-
@@ -0,0 +1,89 @@
+import pandas as pd
+
+from bonds.parser import get_all_bond_tickers, get_credit_rating
+from iss.aimd import AimdController, fan_out
+from iss.cache import CACHE_DIR
+from iss.policy import IssError, RequestPolicy
+
+RATINGS_PATH = CACHE_DIR / "ratings.parquet"
+# Рейтинги меняются редко: запись считается устаревшей через 30 дней
+MAX_AGE = pd.Timedelta(days=30)
+
+
+class RatingIndex:
+    """Сохраняемый на диск индекс SECID -> кредитный рейтинг с датой загрузки.
+
+    Обновляются только новые и устаревшие записи, остальные берутся с диска.
+    """
+
+    def __init__(self, path=RATINGS_PATH, max_age=MAX_AGE):
+        self.path = path
+        self.max_age = max_age
+        if self.path.exists():
+            self.frame = pd.read_parquet(self.path).set_index("secid")
+        else:
+            self.frame = pd.DataFrame({"rating": pd.Series(dtype=object),
+                                       "fetched": pd.Series(dtype="datetime64[ns]")},
+                                      index=pd.Index([], name="secid", dtype=object))
+
+    def __len__(self):
+        return len(self.frame)
+
+    def stale(self, secids, now=None):
+        """Бумаги из secids, которых нет в индексе или запись старше max_age (старые первыми)"""
+        now = now or pd.Timestamp.now()
+        fetched = self.frame["fetched"].reindex(pd.Index(secids).unique())
+        old = fetched[fetched.isna() | (now - fetched > self.max_age)]
+        return list(old.sort_values(na_position="first").index)
+
+    def lookup(self, secids):
+        """Рейтинги пачки бумаг (Series по secids, нет рейтинга - None)"""
+        ratings = self.frame["rating"].reindex(pd.Index(secids))
+        return ratings.astype(object).where(ratings.notna(), None)
+
+    def get(self, secid):
+        return self.lookup([secid]).iloc[0]
+
+    def ensure(self, secids, limit=None, controller=None, rate=20):
+        """Догружает новые и устаревшие записи среди secids, не трогая остальные.
+
+        limit - не больше стольких загрузок за вызов (самые старые первыми),
+        чтобы обновление размазывалось по дням. Возвращает число загрузок.
+        """
+        todo = self.stale(secids)[:limit]
+        if not todo:
+            return 0
+        controller = controller or AimdController(rate=rate)
+        policy = RequestPolicy(controller=controller)
+
+        def fetch(secid):
+            try:
+                return get_credit_rating(secid, policy=policy)
+            except IssError as e:
+                print(f"{secid}: не удалось получить рейтинг — {e}")
+                return IssError
+
+        now = pd.Timestamp.now()
+        fetched = {s: r for s, r in zip(todo, fan_out(fetch, todo, controller)) if r is not IssError}
+        if fetched:
+            update = pd.DataFrame({"rating": pd.Series(fetched, dtype=object), "fetched": now})
+            update.index.name = "secid"
+            self.frame = pd.concat([self.frame.drop(update.index, errors="ignore"), update])
+            self.save()
+        return len(fetched)
+
+    def sync(self, universe=None, limit=None, controller=None, rate=20):
+        """Сверяет индекс со списком облигаций (по умолчанию get_all_bond_tickers()):
+        удаляет выбывшие бумаги и догружает новые/устаревшие.
+        """
+        universe = get_all_bond_tickers() if universe is None else list(universe)
+        removed = self.frame.index.difference(universe)
+        if len(removed):
+            self.frame = self.frame.drop(removed)
+            self.save()
+        loaded = self.ensure(universe, limit=limit, controller=controller, rate=rate)
+        return {"removed": len(removed), "loaded": loaded, "total": len(self.frame)}
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.frame.reset_index().to_parquet(self.path, index=False)
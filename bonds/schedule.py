@@ -0,0 +1,178 @@
+import numpy as np
+import pandas as pd
+
+from bonds.parser import get_all_bond_tickers, get_bondization
+from iss.aimd import AimdController, fan_out
+from iss.cache import CACHE_DIR
+from iss.policy import IssError, RequestPolicy
+
+# Все выплаты одной таблицей, отсортированной по дате: secid, date, kind, value, ...
+FLOWS_PATH = CACHE_DIR / "bondization.parquet"
+# По бумаге: когда загружен график, есть ли неизвестные будущие купоны, дата последней выплаты
+INDEX_PATH = CACHE_DIR / "bondization_index.parquet"
+# Флоатеры (будущий купон еще не объявлен) перезагружаются ежедневно,
+# бумаги с известным графиком - раз в квартал (на случай изменений эмитентом)
+FLOATING_MAX_AGE = pd.Timedelta(days=1)
+FIXED_MAX_AGE = pd.Timedelta(days=90)
+KINDS = ("coupon", "amortization")
+FLOW_COLUMNS = ("secid", "date", "kind", "value", "valueprc", "facevalue", "currency")
+
+
+def _empty_flows():
+    return pd.DataFrame({
+        "secid": pd.Series(dtype=object),
+        "date": pd.Series(dtype="datetime64[ns]"),
+        "kind": pd.Categorical([], categories=KINDS),
+        "value": pd.Series(dtype=float),
+        "valueprc": pd.Series(dtype=float),
+        "facevalue": pd.Series(dtype=float),
+        "currency": pd.Series(dtype=object),
+    })
+
+
+def _empty_index():
+    return pd.DataFrame({"fetched": pd.Series(dtype="datetime64[ns]"),
+                         "floating": pd.Series(dtype=bool),
+                         "last_date": pd.Series(dtype="datetime64[ns]")},
+                        index=pd.Index([], name="secid", dtype=object))
+
+
+def parse_schedule(secid, blocks):
+    """Выплаты одной бумаги из ответа get_bondization в формате таблицы FLOW_COLUMNS"""
+    parts = []
+    for kind, block, date_column in (("coupon", "coupons", "coupondate"),
+                                     ("amortization", "amortizations", "amortdate")):
+        df = blocks.get(block)
+        if df is None or df.empty:
+            continue
+        parts.append(pd.DataFrame({
+            "secid": secid,
+            "date": pd.to_datetime(df[date_column], format="%Y-%m-%d", errors="coerce"),
+            "kind": kind,
+            "value": pd.to_numeric(df.get("value"), errors="coerce"),
+            "valueprc": pd.to_numeric(df.get("valueprc"), errors="coerce"),
+            "facevalue": pd.to_numeric(df.get("facevalue"), errors="coerce"),
+            "currency": df.get("faceunit"),
+        }))
+    if not parts:
+        return _empty_flows()
+    flows = pd.concat(parts, ignore_index=True).dropna(subset=["date"])
+    flows["kind"] = pd.Categorical(flows["kind"], categories=KINDS)
+    return flows
+
+
+class ScheduleStore:
+    """Локальная таблица графиков выплат (bondization) по всем облигациям.
+
+    Перезагружаются только бумаги, график которых мог измениться: новые,
+    флоатеры с необъявленными купонами и давно не обновлявшиеся; у погашенных
+    график больше не запрашивается.
+    """
+
+    def __init__(self, flows_path=FLOWS_PATH, index_path=INDEX_PATH):
+        self.flows_path = flows_path
+        self.index_path = index_path
+        if flows_path.exists() and index_path.exists():
+            self.flows = pd.read_parquet(flows_path)
+            self.flows["secid"] = self.flows["secid"].astype(object)
+            self.index = pd.read_parquet(index_path).set_index("secid")
+        else:
+            self.flows = _empty_flows()
+            self.index = _empty_index()
+        self._dates = self.flows["date"].to_numpy()
+
+    def __len__(self):
+        return len(self.index)
+
+    def stale(self, secids, now=None):
+        """Бумаги из secids, график которых нужно загрузить (новые первыми)"""
+        now = now or pd.Timestamp.now()
+        index = self.index.reindex(pd.Index(secids).unique())
+        age = now - index["fetched"]
+        max_age = np.where(index["floating"].fillna(False).astype(bool), FLOATING_MAX_AGE, FIXED_MAX_AGE)
+        matured = index["last_date"] < now.normalize()
+        todo = index[index["fetched"].isna() | ((age > max_age) & ~matured)]
+        return list(todo["fetched"].sort_values(na_position="first").index)
+
+    def ensure(self, secids, limit=None, controller=None, rate=20):
+        """Загружает графики новых и устаревших бумаг среди secids. Возвращает число загрузок."""
+        todo = self.stale(secids)[:limit]
+        if not todo:
+            return 0
+        controller = controller or AimdController(rate=rate)
+        policy = RequestPolicy(controller=controller)
+
+        def fetch(secid):
+            try:
+                return parse_schedule(secid, get_bondization(secid, policy=policy, force_refresh=True))
+            except IssError as e:
+                print(f"{secid}: не удалось получить график выплат — {e}")
+                return None
+
+        now = pd.Timestamp.now()
+        loaded = {s: f for s, f in zip(todo, fan_out(fetch, todo, controller)) if f is not None}
+        if loaded:
+            self._replace(loaded, now)
+            self.save()
+        return len(loaded)
+
+    def sync(self, universe=None, limit=None, controller=None, rate=20):
+        """Сверяет таблицу со списком облигаций (по умолчанию get_all_bond_tickers()):
+        удаляет выбывшие бумаги и догружает новые/устаревшие графики.
+        """
+        universe = get_all_bond_tickers() if universe is None else list(universe)
+        removed = self.index.index.difference(universe)
+        if len(removed):
+            self._replace({s: None for s in removed}, None)
+            self.save()
+        loaded = self.ensure(universe, limit=limit, controller=controller, rate=rate)
+        return {"removed": len(removed), "loaded": loaded, "total": len(self.index)}
+
+    def _replace(self, schedules, now):
+        """Подменяет графики бумаг (None - удалить) и пересортировывает таблицу по дате"""
+        secids = list(schedules)
+        keep = self.flows[~self.flows["secid"].isin(secids)]
+        new = [f for f in schedules.values() if f is not None and len(f)]
+        flows = pd.concat([keep, *new], ignore_index=True) if new else keep
+        flows["kind"] = pd.Categorical(flows["kind"], categories=KINDS)
+        self.flows = flows.sort_values(["date", "secid"], kind="stable", ignore_index=True)
+        self._dates = self.flows["date"].to_numpy()
+
+        index = self.index.drop(secids, errors="ignore")
+        loaded = {s: f for s, f in schedules.items() if f is not None}
+        if loaded:
+            today = pd.Timestamp(now).normalize()
+            update = pd.DataFrame({
+                "fetched": now,
+                "floating": [bool(((f["date"] >= today) & f["value"].isna()).any()) for f in loaded.values()],
+                "last_date": [f["date"].max() for f in loaded.values()],
+            }, index=pd.Index(list(loaded), name="secid"))
+            index = pd.concat([index, update]) if len(index) else update
+        self.index = index
+
+    def schedule(self, secid):
+        """График выплат одной бумаги"""
+        return self.flows[self.flows["secid"] == secid].reset_index(drop=True)
+
+    def cash_flows(self, start, end, positions=None):
+        """Выплаты с датой в [start, end].
+
+        positions - {secid: количество бумаг} (или Series): тогда остаются
+        только бумаги портфеля и добавляется столбец amount = value * количество.
+        Неизвестные купоны флоатеров - NaN.
+        """
+        # Таблица отсортирована по дате - диапазон находится двоичным поиском
+        lo = np.searchsorted(self._dates, pd.Timestamp(start).to_datetime64(), side="left")
+        hi = np.searchsorted(self._dates, pd.Timestamp(end).to_datetime64(), side="right")
+        flows = self.flows.iloc[lo:hi]
+        if positions is None:
+            return flows.reset_index(drop=True)
+        positions = pd.Series(positions, dtype=float)
+        flows = flows[flows["secid"].isin(positions.index)].reset_index(drop=True)
+        flows["amount"] = flows["value"].to_numpy() * positions.reindex(flows["secid"]).to_numpy()
+        return flows
+
+    def save(self):
+        self.flows_path.parent.mkdir(parents=True, exist_ok=True)
+        self.flows.to_parquet(self.flows_path, index=False)
+        self.index.reset_index().to_parquet(self.index_path, index=False)
@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+
+NO_RATING = "Без рейтинга"
+
+# Корзины дюрации, дни (ISS отдает DURATION в днях)
+DURATION_BUCKETS = [0, 182, 365, 730, 1095, 1825, np.inf]
+DURATION_LABELS = ["до 0.5 г", "0.5-1 г", "1-2 г", "2-3 г", "3-5 г", "от 5 лет"]
+
+
+def _prepare(yields, ratings, yield_col, duration_col):
+    """SECID, рейтинг, доходность и корзина дюрации; бумаги без доходности отбрасываются"""
+    df = pd.DataFrame({
+        "SECID": yields["SECID"].to_numpy(),
+        "yield": pd.to_numeric(yields[yield_col], errors="coerce").to_numpy(dtype=float),
+    })
+    if duration_col in yields.columns:
+        df["duration"] = pd.to_numeric(yields[duration_col], errors="coerce").to_numpy(dtype=float)
+    else:
+        df["duration"] = np.nan
+    # ISS отдает 0 вместо пустого значения у бумаг без сделок
+    df = df[df["yield"].notna() & (df["yield"] != 0)]
+    ratings = pd.Series(ratings, dtype=object)
+    df["rating"] = df["SECID"].map(ratings).fillna(NO_RATING)
+    df["bucket"] = pd.cut(df["duration"], DURATION_BUCKETS, labels=DURATION_LABELS, right=False)
+    return df
+
+
+def rating_spreads(yields, ratings, yield_col="YIELD", duration_col="DURATION", quantiles=(0.25, 0.75)):
+    """Статистика доходностей по кредитному рейтингу.
+
+    yields - DataFrame с колонками SECID и yield_col (например, снимок
+    get_board_snapshot), ratings - словарь/Series SECID -> рейтинг.
+    Возвращает DataFrame по рейтингам: count, mean, median, квантили q25/q75
+    и спред медианы к медиане всего рынка в б.п.
+    """
+    df = _prepare(yields, ratings, yield_col, duration_col)
+    grouped = df.groupby("rating")["yield"]
+    result = grouped.agg(["count", "mean", "median"])
+    for q in quantiles:
+        result[f"q{round(q * 100)}"] = grouped.quantile(q)
+    result["spread_bp"] = (result["median"] - df["yield"].median()) * 100
+    return result.sort_values("median")
+
+
+def duration_spreads(yields, ratings, yield_col="YIELD", duration_col="DURATION", benchmark=None):
+    """Спреды по рейтингу и корзине дюрации, б.п.
+
+    Спред бумаги - доходность минус ориентир её корзины дюрации: по
+    умолчанию медиана всех бумаг корзины, либо benchmark (Series корзина ->
+    доходность, например по кривой ОФЗ). Возвращает медиану спредов:
+    строки - рейтинги, колонки - корзины дюрации.
+    """
+    df = _prepare(yields, ratings, yield_col, duration_col)
+    df = df[df["bucket"].notna()]
+    if benchmark is None:
+        base = df.groupby("bucket", observed=True)["yield"].transform("median")
+    else:
+        base = df["bucket"].map(pd.Series(benchmark)).astype(float)
+    df = df.assign(spread=(df["yield"] - base) * 100)
+    return df.pivot_table(index="rating", columns="bucket", values="spread",
+                          aggfunc="median", observed=True)
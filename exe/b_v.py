@@ -1,9 +1,77 @@
+import hashlib
+import os
+import tempfile
+
 import streamlit as st
 import pandas as pd
 
-#  Запуск - streamlit run D:\python\Moex\exp\b_v.py
+from exp.beneish_stream import iter_scores
+
+#  Запуск из корня проекта (чтобы импортировался пакет exp):
+#  python -m streamlit run exp/b_v.py
 st.title("Beneish M-Score Калькулятор")
 
+mode = st.radio("Режим", ["Одна компания", "Пакет (файл)"], horizontal=True)
+
+
+@st.cache_data(show_spinner="Считаю M-Score...")
+def score_upload(file_hash, _content, suffix, sep, decimal):
+    """M-Score по всем эмитентам файла. Кэш по хэшу содержимого и настройкам
+    разбора, поэтому повторные перерисовки страницы ничего не пересчитывают."""
+    with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as f:
+        f.write(_content)
+    try:
+        chunks = list(iter_scores(f.name, sep=sep, decimal=decimal))
+    finally:
+        os.unlink(f.name)
+    if not chunks:
+        return pd.DataFrame()
+    return pd.concat(chunks, ignore_index=True)
+
+
+def batch_mode():
+    st.write("""
+Загрузи файл с отчётностью многих эмитентов (CSV или Parquet): по строке на
+эмитента и год, колонки **issuer**, **year** и показатели модели (см. exp/beneish.py).
+""")
+    uploaded = st.file_uploader("Файл отчётности", type=["csv", "parquet"])
+    col1, col2 = st.columns(2)
+    sep = col1.selectbox("Разделитель CSV", [",", ";", "\t"], format_func=repr)
+    decimal = col2.selectbox("Десятичный разделитель", [".", ","])
+    if uploaded is None:
+        return
+
+    content = uploaded.getvalue()
+    suffix = ".parquet" if uploaded.name.endswith(".parquet") else ".csv"
+    try:
+        scores = score_upload(hashlib.sha256(content).hexdigest(), content, suffix, sep, decimal)
+    except ValueError as e:
+        st.error(f"Не удалось разобрать файл: {e}")
+        return
+    if scores.empty:
+        st.warning("В файле нет строк для расчёта M-Score")
+        return
+
+    flagged = int(scores["flag_manipulation"].sum())
+    st.write(f"Эмитент-лет: **{len(scores)}**, из них с M > -2.22: **{flagged}**")
+
+    # Сортировка по всей таблице, затем постраничный вывод
+    col1, col2, col3 = st.columns(3)
+    sort_by = col1.selectbox("Сортировать по", list(scores.columns), index=list(scores.columns).index("M_SCORE"))
+    ascending = col2.checkbox("По возрастанию", value=False)
+    page_size = col3.selectbox("Строк на странице", [50, 100, 500], index=1)
+    pages = max(1, -(-len(scores) // page_size))
+    page = st.number_input("Страница", min_value=1, max_value=pages, value=1)
+
+    view = scores.sort_values(sort_by, ascending=ascending, na_position="last")
+    st.dataframe(view.iloc[(page - 1) * page_size:page * page_size], use_container_width=True, hide_index=True)
+    st.download_button("Скачать CSV", view.to_csv(index=False).encode("utf-8"), "beneish_scores.csv", "text/csv")
+
+
+if mode == "Пакет (файл)":
+    batch_mode()
+    st.stop()
+
 st.write("""
 Здесь можно рассчитать вероятность манипуляций в отчётности по модели Бениша.  
 Введи данные за два года (текущий год — **t**, предыдущий — **t-1**).
@@ -1,5 +1,5 @@
 import pandas as pd
-import requests
-j = requests.get('https://iss.moex.com/iss/securities/YNDX/aggregates.json?date=2022-09-21').json()
+from iss.client import get_json
+j = get_json('https://iss.moex.com/iss/securities/YNDX/aggregates.json?date=2022-09-21')
 data = [{k : r[i] for i, k in enumerate(j['aggregates']['columns'])} for r in j['aggregates']['data']]
 print(pd.DataFrame(data))
\ No newline at end of file
@@ -1,18 +1,24 @@
 from pprint import pprint
 import pandas as pd
-import requests
+from iss.projection import get_blocks, records
+from iss.boards import security_url
+from iss.policy import IssError
 
 
 def get_bond_details(s):
     """вывод конкретной инфоррмации по конкретной бумаге"""
-    url = f"https://iss.moex.com/iss/engines/stock/markets/bonds/boards/TQCB/securities/{s}.json"
-    response = requests.get(url)
-
-    if response.status_code != 200:
-        print(f"Ошибка при получении данных для {s}")
+    # Режим торгов бумаги - из индекса iss.boards (TQCB, TQOB, TQIR...)
+    url = security_url(s)
+    if url is None:
+        print(f"Нет данных для {s}")
+        return None
+    # Только два нужных столбца из двух блоков вместо полного ответа
+    columns = {"marketdata_yields": ["EFFECTIVEYIELD"], "securities": ["STATUS"]}
+    try:
+        data = get_blocks(url, columns)
+    except IssError as e:
+        print(f"Ошибка при получении данных для {s}: {e}")
         return None
-
-    data = response.json()
 
     # columns = data['securities']['columns']
     # rows = data['securities']['data']
@@ -24,7 +30,12 @@ def get_bond_details(s):
     # df = pd.DataFrame(rows, columns=columns)
     # pprint(data)
 
-    return data['marketdata_yields']['data'][0][6], data['securities']['data'][0][12]
+    yields, securities = records(data, 'marketdata_yields'), records(data, 'securities')
+    if not yields or not securities:
+        print(f"Нет данных для {s}")
+        return None
+
+    return yields[0]['EFFECTIVEYIELD'], securities[0]['STATUS']
 
 
 # Пример: получение данных по облигации с SECID = 'RU000A0JX0A4'
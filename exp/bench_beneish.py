@@ -0,0 +1,62 @@
+"""
+bench_beneish.py
+
+Сравнение скорости расчёта Beneish M-Score на большой панели:
+  - через safe_div (как compute_beneish, много временных массивов);
+  - через BeneishKernel (буферы выделены заранее, float64 и float32).
+
+Запуск: python -m exp.bench_beneish [число эмитентов]
+"""
+
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from exp.beneish import REQUIRED, BeneishKernel, _beneish_frame, to_matrix
+
+
+def make_panel(n_issuers, years=5, seed=0):
+    """Случайная панель (эмитент, год) с колонками REQUIRED"""
+    rng = np.random.default_rng(seed)
+    index = pd.MultiIndex.from_product([range(n_issuers), range(2019, 2019 + years)])
+    df = pd.DataFrame(rng.uniform(50, 1000, (len(index), len(REQUIRED))), index=index, columns=REQUIRED)
+    df['cogs'] = df['revenue'] * rng.uniform(0.3, 0.9, len(df))
+    return df
+
+
+def best_of(fn, repeat=5):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main(n_issuers=200_000):
+    df = make_panel(n_issuers)
+    t = df
+    t_1 = df.groupby(level=0).shift(1)
+
+    X, X_1 = to_matrix(t), to_matrix(t_1)
+    X32, X32_1 = to_matrix(t, np.float32), to_matrix(t_1, np.float32)
+    kernel, kernel32 = BeneishKernel(len(X)), BeneishKernel(len(X), np.float32)
+
+    # Результаты совпадают
+    reference = _beneish_frame(t, t_1, df.index)['M_SCORE'].to_numpy()
+    assert np.allclose(kernel(X, X_1)[:, 8], reference, equal_nan=True)
+
+    base = best_of(lambda: _beneish_frame(t, t_1, df.index))
+    fast = best_of(lambda: kernel(X, X_1))
+    fast32 = best_of(lambda: kernel32(X32, X32_1))
+
+    print(f"Строк (эмитент-лет): {len(df):,}")
+    print(f"safe_div:              {base * 1000:8.1f} мс")
+    print(f"BeneishKernel float64: {fast * 1000:8.1f} мс  (x{base / fast:.1f})")
+    print(f"BeneishKernel float32: {fast32 * 1000:8.1f} мс  (x{base / fast32:.1f})")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200_000)
@@ -17,16 +17,141 @@ beneish_report.py
 import pandas as pd
 import numpy as np
 
+# Обязательные колонки входной таблицы
+REQUIRED = ['revenue','receivables','cogs','current_assets','total_assets',
+            'depreciation','ppe','sg_and_a','total_liabilities','net_income','cash_from_ops']
+
+# Индексы модели в порядке вектора коэффициентов
+INDEX_COLUMNS = ['DSRI', 'GMI', 'AQI', 'SGI', 'DEPI', 'SGAI', 'LVGI', 'TATA']
+BENEISH_COEFS = np.array([0.92, 0.528, 0.404, 0.892, 0.115, -0.172, -0.327, 4.679])
+BENEISH_CONST = -4.84
+_COL = {name: i for i, name in enumerate(REQUIRED)}
+
 # ---- ВСПОМОГАТЕЛЬНЫЕ ФУНКЦИИ ----
 
 def safe_div(a, b):
     """Деление с защитой: если знаменатель = 0 или NaN → вернём NaN, а не ошибку."""
-    a = np.array(a, dtype=float)
-    b = np.array(b, dtype=float)
-    with np.errstate(divide='ignore', invalid='ignore'):
-        res = np.where((b == 0) | np.isnan(b), np.nan, a / b)
+    a = np.asarray(a, dtype=float)
+    b = np.asarray(b, dtype=float)
+    # Делим только там, где знаменатель не 0 (деление на NaN и так даёт NaN)
+    res = np.full(np.broadcast(a, b).shape, np.nan)
+    np.divide(a, b, out=res, where=b != 0)
     return res
 
+
+class BeneishKernel:
+    """
+    Расчёт индексов Бениша без временных массивов - для больших панелей.
+
+    Работает с матрицами X (год t) и X_1 (год t-1) формы (n, 11), колонки в
+    порядке REQUIRED; лучше в Fortran-порядке (to_matrix), тогда каждая
+    колонка лежит в памяти подряд. Все промежуточные результаты пишутся в
+    заранее выделенные буферы, отношения отношений сводятся к одному
+    делению np.divide(..., where=, out=), M-score - одно скалярное
+    произведение с вектором коэффициентов.
+    Экземпляр можно переиспользовать между вызовами (например, по чанкам).
+    """
+
+    # Строк в блоке: промежуточные буферы блока помещаются в кэш процессора
+    BLOCK = 4096
+
+    def __init__(self, n=0, dtype=np.float64):
+        self.dtype = np.dtype(dtype)
+        self.coefs = BENEISH_COEFS.astype(self.dtype)
+        self._allocate(n)
+
+    def _allocate(self, n):
+        self.capacity = n
+        # 8 индексов + M_SCORE, колонки подряд в памяти
+        self.out = np.empty((n, len(INDEX_COLUMNS) + 1), dtype=self.dtype, order='F')
+        self._tmp = np.empty((4, self.BLOCK), dtype=self.dtype)
+        self._mask = np.empty(self.BLOCK, dtype=bool)
+        self._nonzero = np.empty(self.BLOCK, dtype=bool)
+
+    def _div(self, a, b, out):
+        # out не должен совпадать с a или b; _mask уже заполнена
+        out.fill(np.nan)
+        np.divide(a, b, out=out, where=self._mask[:len(out)])
+        return out
+
+    def _cross(self, n1, d1, n0, d0, out):
+        """
+        (n1/d1) / (n0/d0) = n1*d0 / (d1*n0) - одно деление вместо трёх.
+        NaN, как и у цепочки safe_div, если ноль любой из знаменателей: d1, d0 или n0.
+        """
+        n = len(out)
+        a, b = self._tmp[0, :n], self._tmp[1, :n]
+        mask, nonzero = self._mask[:n], self._nonzero[:n]
+        np.multiply(n1, d0, out=a)
+        np.multiply(d1, n0, out=b)
+        # Маска по каждому знаменателю отдельно: произведение d1*n0*d0 в float32
+        # переполняется уже на рублевых суммах порядка 1e13
+        np.not_equal(d1, 0, out=mask)
+        mask &= np.not_equal(n0, 0, out=nonzero)
+        mask &= np.not_equal(d0, 0, out=nonzero)
+        return self._div(a, b, out)
+
+    def __call__(self, X, X_1):
+        """Возвращает массив (n, 9): индексы в порядке INDEX_COLUMNS и M_SCORE (вид на буфер)"""
+        n = len(X)
+        if n > self.capacity:
+            self._allocate(n)
+        # Считаем блоками по BLOCK строк, чтобы не гонять большие массивы через память
+        for start in range(0, n, self.BLOCK):
+            end = min(start + self.BLOCK, n)
+            self._block(X[start:end], X_1[start:end], self.out[start:end])
+        return self.out[:n]
+
+    def _block(self, X, X_1, out):
+        n = len(X)
+        c = _COL
+        e, f = self._tmp[2, :n], self._tmp[3, :n]
+        mask = self._mask[:n]
+
+        # DSRI = (rec/rev)_t / (rec/rev)_{t-1}
+        self._cross(X[:, c['receivables']], X[:, c['revenue']],
+                    X_1[:, c['receivables']], X_1[:, c['revenue']], out[:, 0])
+
+        # GMI = gm_{t-1} / gm_t, gm = (rev - cogs) / rev
+        np.subtract(X_1[:, c['revenue']], X_1[:, c['cogs']], out=e)
+        np.subtract(X[:, c['revenue']], X[:, c['cogs']], out=f)
+        self._cross(e, X_1[:, c['revenue']], f, X[:, c['revenue']], out[:, 1])
+
+        # AQI = (1 - ca/ta)_t / (1 - ca/ta)_{t-1}, 1 - ca/ta = (ta - ca) / ta
+        np.subtract(X[:, c['total_assets']], X[:, c['current_assets']], out=e)
+        np.subtract(X_1[:, c['total_assets']], X_1[:, c['current_assets']], out=f)
+        self._cross(e, X[:, c['total_assets']], f, X_1[:, c['total_assets']], out[:, 2])
+
+        # SGI = rev_t / rev_{t-1}
+        np.not_equal(X_1[:, c['revenue']], 0, out=mask)
+        self._div(X[:, c['revenue']], X_1[:, c['revenue']], out[:, 3])
+
+        # DEPI = (dep/(dep+ppe))_{t-1} / (dep/(dep+ppe))_t
+        np.add(X_1[:, c['depreciation']], X_1[:, c['ppe']], out=e)
+        np.add(X[:, c['depreciation']], X[:, c['ppe']], out=f)
+        self._cross(X_1[:, c['depreciation']], e, X[:, c['depreciation']], f, out[:, 4])
+
+        # SGAI, LVGI - как DSRI
+        self._cross(X[:, c['sg_and_a']], X[:, c['revenue']],
+                    X_1[:, c['sg_and_a']], X_1[:, c['revenue']], out[:, 5])
+        self._cross(X[:, c['total_liabilities']], X[:, c['total_assets']],
+                    X_1[:, c['total_liabilities']], X_1[:, c['total_assets']], out[:, 6])
+
+        # TATA = (net_income - cfo) / ta
+        np.subtract(X[:, c['net_income']], X[:, c['cash_from_ops']], out=e)
+        np.not_equal(X[:, c['total_assets']], 0, out=mask)
+        self._div(e, X[:, c['total_assets']], out[:, 7])
+
+        # M-score = const + индексы · коэффициенты
+        m = out[:, 8]
+        np.dot(out[:, :8], self.coefs, out=m)
+        m += BENEISH_CONST
+
+
+def to_matrix(df, dtype=np.float64):
+    """Колонки REQUIRED одной матрицей (n, 11) в Fortran-порядке"""
+    return np.asfortranarray(df[REQUIRED].to_numpy(dtype=dtype))
+
 # ---- ОСНОВНАЯ ФУНКЦИЯ ----
 
 def compute_beneish(df):
@@ -39,16 +164,73 @@ def compute_beneish(df):
     """
 
     # Проверка обязательных колонок
-    required = ['revenue','receivables','cogs','current_assets','total_assets',
-                'depreciation','ppe','sg_and_a','total_liabilities','net_income','cash_from_ops']
-    missing = [c for c in required if c not in df.columns]
-    if missing:
-        raise ValueError(f"В таблице не хватает колонок: {', '.join(missing)}")
+    _check_columns(df)
 
     # Берём текущий год (t) и предыдущий год (t-1)
     t = df
     t_1 = df.shift(1)
 
+    return _beneish_frame(t, t_1, df.index)
+
+
+def compute_beneish_panel(df, dtype=np.float64, kernel=None):
+    """
+    Panel-режим: много компаний сразу за один векторный проход.
+
+    Принимает DataFrame в длинном формате с MultiIndex (эмитент, год) и теми же
+    столбцами, что compute_beneish. Предыдущий год берётся внутри эмитента и
+    только если это действительно год t-1: при пропуске года в середине ряда
+    индексы для следующего года будут NaN, а не сравнением через разрыв.
+
+    Считается через BeneishKernel: dtype=np.float32 вдвое экономит память,
+    kernel - готовый экземпляр для повторного использования буферов.
+
+    Пары (эмитент, год) должны быть уникальны, иначе ValueError со списком повторов.
+
+    Возвращает DataFrame с тем же индексом и теми же колонками, что compute_beneish.
+    """
+    _check_columns(df)
+    if df.index.nlevels != 2:
+        raise ValueError("Ожидается MultiIndex (эмитент, год)")
+    duplicated = df.index[df.index.duplicated()].unique()
+    if len(duplicated):
+        shown = ", ".join(f"{i}/{y}" for i, y in duplicated[:5])
+        more = f" и ещё {len(duplicated) - 5}" if len(duplicated) > 5 else ""
+        raise ValueError(f"Повторяются строки (эмитент, год): {shown}{more}")
+
+    t = df[REQUIRED].sort_index()
+    issuer = t.index.get_level_values(0)
+    year = np.asarray(t.index.get_level_values(1), dtype=float)
+
+    # Лаг внутри эмитента: строка выше того же эмитента и ровно на год раньше
+    same_issuer = np.zeros(len(t), dtype=bool)
+    same_issuer[1:] = issuer[1:] == issuer[:-1]
+    prev_year = np.full(len(t), np.nan)
+    prev_year[1:] = year[:-1]
+    valid = same_issuer & (year - prev_year == 1)
+
+    X = to_matrix(t, dtype)
+    X_1 = np.empty_like(X)
+    X_1[0] = np.nan
+    X_1[1:] = X[:-1]
+    X_1[~valid] = np.nan
+
+    kernel = kernel or BeneishKernel(len(X), dtype)
+    scores = kernel(X, X_1)
+
+    result = pd.DataFrame(scores.copy(), index=t.index, columns=INDEX_COLUMNS + ['M_SCORE'])
+    result['flag_manipulation'] = result['M_SCORE'] > -2.22
+    return result.reindex(df.index)
+
+
+def _check_columns(df):
+    missing = [c for c in REQUIRED if c not in df.columns]
+    if missing:
+        raise ValueError(f"В таблице не хватает колонок: {', '.join(missing)}")
+
+
+def _beneish_frame(t, t_1, index):
+    """Индексы Бениша и M-score по текущему (t) и предыдущему (t_1) периоду"""
     # Индексы Beneish
     DSRI = safe_div(safe_div(t['receivables'], t['revenue']),
                     safe_div(t_1['receivables'], t_1['revenue']))
@@ -95,7 +277,7 @@ def compute_beneish(df):
         'LVGI': LVGI,
         'TATA': TATA,
         'M_SCORE': M
-    }, index=df.index)
+    }, index=index)
 
     result['flag_manipulation'] = result['M_SCORE'] > -2.22
 
@@ -0,0 +1,154 @@
+"""
+beneish_stream.py
+
+Потоковый расчёт Beneish M-Score для больших файлов отчётности (CSV или Parquet)
+по многим эмитентам.
+
+Что делает:
+1. Читает файл кусками через pyarrow (в памяти только текущий кусок).
+2. Приводит числа к float: "1 200 000" → 1200000, при decimal="," ещё и "1 200,5" → 1200.5.
+3. Переименовывает колонки по словарю синонимов (ALIASES) и досчитывает
+   недостающие: cogs = revenue - gross_profit, sg_and_a = selling + administrative,
+   total_liabilities = total_assets - equity.
+4. Считает индексы compute_beneish_panel по каждому куску. Последняя строка
+   куска переносится в следующий, чтобы у первого года там был предыдущий год.
+5. Пишет результат в Parquet по мере расчёта.
+
+Файл должен быть отсортирован по эмитенту и году (как обычно и выгружают отчётность):
+предыдущий год ищется внутри куска и в перенесённой строке.
+"""
+
+import csv
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pv
+import pyarrow.parquet as pq
+
+from exp.beneish import REQUIRED, BeneishKernel, compute_beneish_panel
+
+# Синонимы колонок (в нижнем регистре) → имена, которые ждёт compute_beneish
+ALIASES = {
+    'выручка': 'revenue', 'sales': 'revenue', 'net_sales': 'revenue',
+    'дебиторская задолженность': 'receivables', 'accounts_receivable': 'receivables',
+    'trade_receivables': 'receivables',
+    'себестоимость': 'cogs', 'cost_of_goods_sold': 'cogs', 'cost_of_sales': 'cogs',
+    'валовая прибыль': 'gross_profit',
+    'оборотные активы': 'current_assets',
+    'активы': 'total_assets', 'итого активы': 'total_assets',
+    'амортизация': 'depreciation', 'accumulated_depreciation': 'depreciation',
+    'основные средства': 'ppe', 'net_ppe': 'ppe',
+    'sga': 'sg_and_a', 'sg&a': 'sg_and_a',
+    'коммерческие расходы': 'selling', 'управленческие расходы': 'administrative',
+    'обязательства': 'total_liabilities', 'liabilities': 'total_liabilities',
+    'капитал': 'equity', 'total_equity': 'equity',
+    'чистая прибыль': 'net_income', 'net_profit': 'net_income',
+    'cfo': 'cash_from_ops', 'operating_cash_flow': 'cash_from_ops',
+    'эмитент': 'issuer', 'компания': 'issuer', 'secid': 'issuer', 'год': 'year',
+}
+
+# Пробелы внутри чисел: обычный, неразрывный, узкий неразрывный
+_SPACES = "[\\s\u00a0\u202f]"
+_RESULT_COLUMNS = ['DSRI', 'GMI', 'AQI', 'SGI', 'DEPI', 'SGAI', 'LVGI', 'TATA', 'M_SCORE', 'flag_manipulation']
+
+
+def _read_header(path, sep):
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        return next(csv.reader(f, delimiter=sep))
+
+
+def iter_batches(path, sep=',', batch_rows=100_000, block_size=1 << 22):
+    """Куски файла (pyarrow.RecordBatch): batch_rows строк для Parquet, block_size
+    байт для CSV. Для CSV все колонки читаются строками - числа с пробелами
+    разбирает normalize."""
+    if str(path).endswith('.parquet'):
+        yield from pq.ParquetFile(path).iter_batches(batch_size=batch_rows)
+        return
+    header = _read_header(path, sep)
+    reader = pv.open_csv(
+        path,
+        read_options=pv.ReadOptions(block_size=block_size, encoding='utf8'),
+        parse_options=pv.ParseOptions(delimiter=sep),
+        convert_options=pv.ConvertOptions(column_types={c: pa.string() for c in header}),
+    )
+    yield from reader
+
+
+def _to_number(column, decimal):
+    if not pa.types.is_string(column.type) and not pa.types.is_large_string(column.type):
+        return column.to_pandas().astype(float)
+    column = pc.replace_substring_regex(column, _SPACES, '')
+    column = pc.replace_substring(column, '−', '-')
+    if decimal != '.':
+        column = pc.replace_substring(column, decimal, '.')
+    return pd.to_numeric(column.to_pandas(), errors='coerce')
+
+
+def normalize(batch, aliases=ALIASES, decimal='.'):
+    """RecordBatch → DataFrame с колонками issuer, year и REQUIRED (float)"""
+    names = [aliases.get(n.strip().lower(), n.strip().lower()) for n in batch.schema.names]
+    keys = [c for c in ('issuer', 'year') if c not in names]
+    if keys:
+        raise ValueError(f"В таблице нет колонок {', '.join(keys)} (или их синонимов из ALIASES); "
+                         f"есть: {', '.join(batch.schema.names)}")
+    df = pd.DataFrame({'issuer': batch.column(names.index('issuer')).to_pandas().astype(str),
+                       'year': _to_number(batch.column(names.index('year')), decimal)})
+    df['year'] = df['year'].astype('Int64')
+    for i, name in enumerate(names):
+        if name not in ('issuer', 'year'):
+            df[name] = _to_number(batch.column(i), decimal).to_numpy(dtype=float)
+
+    # Недостающие строки, которые можно вывести из других
+    if 'cogs' not in df and {'revenue', 'gross_profit'} <= set(df):
+        df['cogs'] = df['revenue'] - df['gross_profit']
+    if 'sg_and_a' not in df and {'selling', 'administrative'} <= set(df):
+        df['sg_and_a'] = df['selling'].fillna(0) + df['administrative'].fillna(0)
+    if 'total_liabilities' not in df and {'total_assets', 'equity'} <= set(df):
+        df['total_liabilities'] = df['total_assets'] - df['equity']
+
+    missing = [c for c in REQUIRED if c not in df.columns]
+    if missing:
+        raise ValueError(f"В таблице не хватает колонок: {', '.join(missing)}")
+    return df[['issuer', 'year'] + REQUIRED]
+
+
+def iter_scores(path, sep=',', decimal='.', aliases=ALIASES, batch_rows=100_000, block_size=1 << 22,
+                dtype=np.float64):
+    """Генератор DataFrame с результатами по кускам файла (issuer, year, индексы, M_SCORE)"""
+    kernel = BeneishKernel(0, dtype)
+    carry = None
+    for batch in iter_batches(path, sep, batch_rows, block_size):
+        if batch.num_rows == 0:
+            continue
+        chunk = normalize(batch, aliases, decimal)
+        # Перенесённая строка - только как предыдущий год, в результат не попадает
+        data = chunk if carry is None else pd.concat([carry, chunk], ignore_index=True)
+        scores = compute_beneish_panel(data.set_index(['issuer', 'year']), dtype=dtype, kernel=kernel)
+        scores = scores.iloc[len(data) - len(chunk):].reset_index()
+        carry = chunk.iloc[[-1]]
+        yield scores
+
+
+def score_file(path, out_path, sep=',', decimal='.', aliases=ALIASES, batch_rows=100_000, block_size=1 << 22,
+               dtype=np.float64):
+    """Считает M-Score для всего файла и пишет результат в Parquet. Возвращает число строк."""
+    rows = 0
+    writer = None
+    try:
+        for scores in iter_scores(path, sep, decimal, aliases, batch_rows, block_size, dtype):
+            table = pa.Table.from_pandas(scores[['issuer', 'year'] + _RESULT_COLUMNS], preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(out_path, table.schema)
+            writer.write_table(table)
+            rows += len(scores)
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows
+
+
+if __name__ == "__main__":
+    import sys
+    print(f"Строк обработано: {score_file(sys.argv[1], sys.argv[2])}")
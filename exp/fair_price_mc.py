@@ -0,0 +1,163 @@
+# Монте-Карло для справедливой цены CompanyData.fair_price:
+# входные параметры задаются распределениями, сценарии считаются
+# векторно кусками (память не зависит от числа сценариев)
+
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from exp.spravedlivaya_cena import CompanyData
+
+# Параметры, для которых можно задать распределение
+INPUTS = ['historical_pe', 'interest_rate', 'revenue', 'operating_expenses', 'tax_rate',
+          'net_debt', 'shares_outstanding']
+PERCENTILES = (5, 25, 50, 75, 95)
+CHUNK = 200_000
+BINS = 20_000
+
+
+def sample(spec, rng, size):
+    """Выборка size значений по описанию распределения.
+
+    spec - число (фиксированное значение) или кортеж:
+      ("normal", среднее, ст.откл.), ("uniform", мин, макс),
+      ("triangular", мин, мода, макс), ("lognormal", mu, sigma).
+    """
+    if np.isscalar(spec):
+        return np.full(size, float(spec))
+    kind, *args = spec
+    if kind == "normal":
+        return rng.normal(args[0], args[1], size)
+    if kind == "uniform":
+        return rng.uniform(args[0], args[1], size)
+    if kind == "triangular":
+        return rng.triangular(args[0], args[1], args[2], size)
+    if kind == "lognormal":
+        return rng.lognormal(args[0], args[1], size)
+    raise ValueError(f"Неизвестное распределение: {kind}")
+
+
+def _specs(company, distributions):
+    unknown = set(distributions) - set(INPUTS)
+    if unknown:
+        raise ValueError(f"Нельзя задать распределение для: {', '.join(sorted(unknown))}")
+    return {name: distributions.get(name, getattr(company, name)) for name in INPUTS}
+
+
+def _prices(specs, rng, size):
+    """Справедливая цена для size сценариев - та же формула, что fair_price"""
+    s = {name: sample(spec, rng, size) for name, spec in specs.items()}
+    profit = (s['revenue'] - s['operating_expenses'] - s['net_debt'] * s['interest_rate']) * (1 - s['tax_rate'])
+    return profit * s['historical_pe'] / s['shares_outstanding']
+
+
+def _run_chunks(specs, seeds, sizes, edges, market_price):
+    """Гистограмма и суммы по кускам сценариев (выполняется и в дочерних процессах)"""
+    counts = np.zeros(len(edges) + 1, dtype=np.int64)
+    total = total_sq = 0.0
+    upside = 0
+    for seed, size in zip(seeds, sizes):
+        prices = _prices(specs, np.random.default_rng(seed), size)
+        prices = prices[np.isfinite(prices)]
+        # индекс 0 - ниже диапазона, len(edges) - выше
+        counts += np.bincount(np.searchsorted(edges, prices, side='right'), minlength=len(counts))
+        total += prices.sum()
+        total_sq += np.square(prices).sum()
+        if market_price is not None:
+            upside += np.count_nonzero(prices > market_price)
+    return counts, total, total_sq, upside
+
+
+def simulate_fair_price(company: CompanyData, distributions, n=1_000_000, seed=None,
+                        percentiles=PERCENTILES, chunk=CHUNK, processes=None):
+    """Распределение справедливой цены при неопределённых входных данных.
+
+    distributions - словарь {параметр: распределение} (см. sample), не
+    указанные параметры берутся из company. Сценарии считаются кусками по
+    chunk штук; processes - число процессов. Каждый кусок получает свой
+    поток случайных чисел из seed (число или np.random.SeedSequence), поэтому при одном seed результат не
+    зависит от числа процессов.
+
+    Возвращает словарь: percentiles (цена по перцентилям, с точностью до
+    ширины корзины гистограммы), mean, std, prob_upside - вероятность, что
+    справедливая цена выше рыночной (market_cap / shares_outstanding), n.
+    """
+    specs = _specs(company, distributions)
+    market_price = company.market_cap / company.shares_outstanding if company.market_cap else None
+
+    sizes = [min(chunk, n - start) for start in range(0, n, chunk)]
+    if not isinstance(seed, np.random.SeedSequence):
+        seed = np.random.SeedSequence(seed)
+    *seeds, pilot_seed = seed.spawn(len(sizes) + 1)
+
+    # Границы гистограммы - по пробной выборке с запасом
+    pilot = _prices(specs, np.random.default_rng(pilot_seed), min(n, 20_000))
+    pilot = pilot[np.isfinite(pilot)]
+    lo, hi = np.percentile(pilot, [0.01, 99.99])
+    margin = (hi - lo) or 1.0
+    edges = np.linspace(lo - margin, hi + margin, BINS + 1)
+
+    if processes and processes > 1 and len(sizes) > 1:
+        parts = [(seeds[i::processes], sizes[i::processes]) for i in range(processes)]
+        with ProcessPoolExecutor(processes) as pool:
+            results = list(pool.map(_run_chunks, *zip(*[(specs, s, z, edges, market_price) for s, z in parts])))
+    else:
+        results = [_run_chunks(specs, seeds, sizes, edges, market_price)]
+
+    counts = sum(r[0] for r in results)
+    total = sum(r[1] for r in results)
+    total_sq = sum(r[2] for r in results)
+    upside = sum(r[3] for r in results)
+    valid = counts.sum()
+
+    # Перцентиль - середина корзины, в которую попадает нужная доля сценариев
+    cumulative = np.cumsum(counts)
+    centers = np.concatenate([[edges[0]], (edges[:-1] + edges[1:]) / 2, [edges[-1]]])
+    result = {p: round(float(centers[np.searchsorted(cumulative, valid * p / 100)]), 2) for p in percentiles}
+
+    mean = total / valid
+    return {
+        'percentiles': result,
+        'mean': round(float(mean), 2),
+        'std': round(float(np.sqrt(max(total_sq / valid - mean ** 2, 0.0))), 2),
+        'prob_upside': float(upside / valid) if market_price is not None else None,
+        'market_price': market_price,
+        'n': int(valid),
+    }
+
+
+def _simulate_one(args):
+    company, distributions, n, seed = args
+    return company.name, simulate_fair_price(company, distributions, n=n, seed=seed)
+
+
+def simulate_portfolio(companies, distributions, n=1_000_000, seed=None, processes=None):
+    """simulate_fair_price для списка компаний, компании распределяются по процессам.
+
+    distributions - общий словарь или {имя компании: словарь}.
+    """
+    per_company = all(c.name in distributions for c in companies) and bool(companies)
+    seeds = np.random.SeedSequence(seed).spawn(len(companies))
+    tasks = [(c, distributions[c.name] if per_company else distributions, n, s)
+             for c, s in zip(companies, seeds)]
+    with ProcessPoolExecutor(processes) as pool:
+        return dict(pool.map(_simulate_one, tasks))
+
+
+if __name__ == "__main__":
+    import time
+
+    polyus = CompanyData(
+        name="Полюс", projected_net_profit=269.1, historical_pe=5, shares_outstanding=0.1349,
+        revenue=603.2, operating_expenses=223.3, net_debt=622.7, interest_rate=0.07,
+        total_assets=1200, total_equity=550, ebitda=370, free_cash_flow=250, market_cap=1600,
+    )
+    start = time.perf_counter()
+    res = simulate_fair_price(polyus, {
+        'historical_pe': ("triangular", 4, 5, 7),
+        'interest_rate': ("normal", 0.07, 0.015),
+        'revenue': ("normal", 603.2, 40),
+        'operating_expenses': ("normal", 223.3, 15),
+    }, n=5_000_000, seed=1)
+    print(f"Точечная оценка: {polyus.fair_price()} руб")
+    print(res, f"{time.perf_counter() - start:.2f} c")
@@ -0,0 +1,87 @@
+# Пакетная отрисовка графиков мультипликаторов (CompanyData.draw_multiples)
+# без дисплея: Agg-холст без pyplot, одна фигура на процесс переиспользуется
+# для всех компаний, картинки - байтами или файлами PNG/SVG
+
+import io
+import re
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+
+class MultiplesRenderer:
+    """Одна фигура и одни оси, которые очищаются перед каждой компанией"""
+
+    def __init__(self, figsize=(10, 6), dpi=100):
+        # constrained layout пересчитывает поля при каждой отрисовке:
+        # длинные заголовки и подписи осей у разных компаний не обрезаются
+        self.fig = Figure(figsize=figsize, dpi=dpi, layout="constrained")
+        FigureCanvasAgg(self.fig)
+        self.ax = self.fig.add_subplot()
+
+    def render(self, company, fmt="png"):
+        """График компании в формате fmt (png/svg), байты"""
+        self.ax.clear()
+        company.draw_multiples(self.ax)
+        buf = io.BytesIO()
+        # Быстрое сжатие PNG: кодирование заметная доля времени рендера
+        options = {"pil_kwargs": {"compress_level": 1}} if fmt == "png" else {}
+        self.fig.savefig(buf, format=fmt, **options)
+        return buf.getvalue()
+
+
+def report_key(company):
+    """Ключ отчета: название и SECID, если он задан"""
+    return f"{company.name} ({company.secid})" if company.secid else company.name
+
+
+def file_name(company, fmt):
+    """Имя файла по названию и SECID компании (без символов, недопустимых в путях)"""
+    key = f"{company.name}_{company.secid}" if company.secid else company.name
+    name = re.sub(r'[^\w.-]+', '_', key)
+    return f"{name}.{fmt}"
+
+
+_renderer = None
+
+
+def _init_worker(figsize, dpi):
+    global _renderer
+    _renderer = MultiplesRenderer(figsize, dpi)
+
+
+def _render_one(args):
+    company, fmt, out_dir = args
+    data = _renderer.render(company, fmt)
+    if out_dir is None:
+        return report_key(company), data
+    path = Path(out_dir) / file_name(company, fmt)
+    path.write_bytes(data)
+    return report_key(company), path
+
+
+def render_multiples(companies, out_dir=None, fmt="png", processes=None, figsize=(10, 6), dpi=100):
+    """Графики мультипликаторов для списка компаний.
+
+    out_dir=None - возвращает {ключ: байты}, иначе пишет файлы и возвращает
+    {ключ: путь}; ключ - report_key (название и SECID). processes > 1 -
+    рендер в пуле процессов, в каждом своя переиспользуемая фигура.
+    """
+    # Одинаковые ключи перезаписали бы друг друга - такие компании различает только SECID
+    keys = [report_key(c) for c in companies]
+    duplicates = sorted({k for k in keys if keys.count(k) > 1})
+    if duplicates:
+        raise ValueError(f"Повторяются компании (название и SECID): {', '.join(duplicates)}")
+    if out_dir is not None:
+        Path(out_dir).mkdir(parents=True, exist_ok=True)
+    tasks = [(c, fmt, out_dir) for c in companies]
+
+    if processes and processes > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(processes, initializer=_init_worker, initargs=(figsize, dpi)) as pool:
+            chunksize = max(1, len(tasks) // (processes * 4))
+            return dict(pool.map(_render_one, tasks, chunksize=chunksize))
+
+    _init_worker(figsize, dpi)
+    return dict(map(_render_one, tasks))
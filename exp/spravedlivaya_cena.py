@@ -1,7 +1,9 @@
 # Модель оценки компании по фундаментальному анализу
 
-from dataclasses import dataclass
+from dataclasses import MISSING, asdict, dataclass, fields
 import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
 
 @dataclass
 class CompanyData:
@@ -20,6 +22,7 @@ class CompanyData:
     free_cash_flow: float = None # свободный денежный поток (FCF)
     market_cap: float = None     # рыночная капитализация, млрд руб
     tax_rate: float = 0.25       # налоговая ставка (по умолчанию 25%)
+    secid: str = None            # тикер MOEX, различает компании с одинаковым названием
 
     def forecast_profit(self):
         financial_expenses = self.net_debt * self.interest_rate
@@ -133,12 +136,17 @@ class CompanyData:
         return conclusions
 
     def plot_multiples(self):
+        fig, ax = plt.subplots(figsize=(10, 6))
+        self.draw_multiples(ax)
+        fig.tight_layout()
+        plt.show()
+
+    def draw_multiples(self, ax):
+        """Рисует столбцы мультипликаторов на переданных осях (matplotlib Axes)"""
         multiples, warnings = self.calc_multiples()
         labels = list(multiples.keys())
         values = list(multiples.values())
 
-        plt.figure(figsize=(10, 6))
-
         colors = []
         for label in labels:
             if warnings.get(label) == "Опасно":
@@ -148,43 +156,150 @@ class CompanyData:
             else:
                 colors.append('green')
 
-        bars = plt.bar(labels, values, color=colors)
-        plt.title(f"Мультипликаторы для {self.name}")
-        plt.ylabel("Значение")
-        plt.grid(axis='y', linestyle='--', alpha=0.7)
+        bars = ax.bar(labels, values, color=colors)
+        ax.set_title(f"Мультипликаторы для {self.name}")
+        ax.set_ylabel("Значение")
+        ax.grid(axis='y', linestyle='--', alpha=0.7)
         for bar, label in zip(bars, labels):
             yval = bar.get_height()
             warn = warnings.get(label, "")
-            plt.text(bar.get_x() + bar.get_width()/2, yval + 0.1, f"{yval:.2f} ({warn})", ha='center', va='bottom')
-        plt.tight_layout()
-        plt.show()
+            ax.text(bar.get_x() + bar.get_width()/2, yval + 0.1, f"{yval:.2f} ({warn})", ha='center', va='bottom')
+
+
+# Пороговые зоны мультипликаторов: (опасно, погранично), как в CompanyData.calc_multiples
+_BANDS = {
+    'P/E': (lambda x: (x > 20) | (x < 2), lambda x: ((2 <= x) & (x <= 5)) | ((15 <= x) & (x <= 20))),
+    'P/BV': (lambda x: (x < 0.3) | (x > 3), lambda x: ((0.3 <= x) & (x <= 0.5)) | ((2 <= x) & (x <= 3))),
+    'P/FCF': (lambda x: x > 20, lambda x: (15 <= x) & (x <= 20)),
+    'Net Debt/EBITDA': (lambda x: x > 3, lambda x: (2 <= x) & (x <= 3)),
+    'Debt/Equity': (lambda x: x > 3, lambda x: (2 <= x) & (x <= 3)),
+    'Debt/Assets': (lambda x: x > 0.9, lambda x: (0.7 <= x) & (x <= 0.9)),
+}
+
+
+class CompanyFrame:
+    """Колоночный вариант CompanyData: N компаний в одном DataFrame.
+
+    Справедливая цена, мультипликаторы, их зоны (OK/Погранично/Опасно) и
+    итоговый риск считаются сразу для всех компаний, без цикла по объектам.
+    Пустые значения (None/NaN/0) трактуются так же, как в CompanyData -
+    мультипликатор не считается.
+    """
+
+    COLUMNS = [f.name for f in fields(CompanyData)]
+    # Поля со значением по умолчанию необязательны: недостающая колонка заполняется им
+    # (None у числовых полей - NaN, мультипликатор не считается)
+    REQUIRED = [f.name for f in fields(CompanyData) if f.default is MISSING]
+    DEFAULTS = {f.name: np.nan if f.default is None and f.type is float else f.default
+                for f in fields(CompanyData) if f.default is not MISSING}
+
+    def __init__(self, df):
+        missing = [c for c in self.REQUIRED if c not in df.columns]
+        if missing:
+            raise ValueError(f"Не хватает колонок: {', '.join(missing)}")
+        self.df = df.copy()
+        for column, default in self.DEFAULTS.items():
+            if column not in self.df:
+                self.df[column] = default
+        self.df = self.df.set_index('name', drop=False)
+        self.df.index.name = None
+
+    @classmethod
+    def from_companies(cls, companies):
+        return cls(pd.DataFrame([asdict(c) for c in companies]))
+
+    def _col(self, name):
+        return self.df[name].to_numpy(dtype=float, na_value=np.nan)
+
+    def forecast_profit(self):
+        financial_expenses = self._col('net_debt') * self._col('interest_rate')
+        ebt = self._col('revenue') - self._col('operating_expenses') - financial_expenses
+        return pd.Series(ebt * (1 - self._col('tax_rate')), index=self.df.index)
+
+    def fair_price(self):
+        net_profit = self.forecast_profit().to_numpy()
+        price = net_profit * self._col('historical_pe') / self._col('shares_outstanding')
+        return pd.Series(np.round(price, 2), index=self.df.index)
+
+    def calc_multiples(self):
+        """Возвращает (multiples, warnings): DataFrame по компаниям, NaN/None - не посчитано"""
+        def present(x):
+            return ~np.isnan(x) & (x != 0)
+
+        mc, profit = self._col('market_cap'), self._col('projected_net_profit')
+        equity, fcf = self._col('total_equity'), self._col('free_cash_flow')
+        debt, ebitda, assets = self._col('net_debt'), self._col('ebitda'), self._col('total_assets')
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            raw = {
+                'P/E': np.where(present(mc) & present(profit), mc / profit, np.nan),
+                'P/BV': np.where(present(mc) & present(equity), mc / equity, np.nan),
+                'P/FCF': np.where(present(mc) & present(fcf), mc / fcf, np.nan),
+                'Net Debt/EBITDA': np.where(present(debt) & present(ebitda), debt / ebitda, np.nan),
+                'Debt/Equity': np.where(present(equity), debt / equity, np.nan),
+                'Debt/Assets': np.where(present(assets), debt / assets, np.nan),
+            }
+
+        warnings = {}
+        for name, x in raw.items():
+            danger, border = _BANDS[name]
+            with np.errstate(invalid='ignore'):
+                band = np.select([np.isnan(x), danger(x), border(x)], [None, "Опасно", "Погранично"], "OK")
+            warnings[name] = band
+
+        multiples = pd.DataFrame({k: np.round(v, 2) for k, v in raw.items()}, index=self.df.index)
+        return multiples, pd.DataFrame(warnings, index=self.df.index, dtype=object)
+
+    @staticmethod
+    def risk(warnings):
+        """Балл и уровень риска по зонам мультипликаторов (как interpret_warnings)"""
+        danger = warnings == "Опасно"
+        score = (2 * (danger['Net Debt/EBITDA'] | danger['Debt/Equity'])
+                 + 2 * (danger['P/E'] & danger['P/BV'])
+                 + 1 * (danger['P/E'] & (warnings['P/BV'] == "OK"))
+                 + 1 * danger['P/FCF']
+                 + 3 * danger['Debt/Assets'])
+        level = np.select([score == 0, score <= 3], ["Низкий риск", "Средний риск"], "Высокий риск")
+        return pd.DataFrame({'risk_score': score, 'risk_level': level}, index=warnings.index)
+
+    def screen(self):
+        """Сводная таблица: справедливая цена, мультипликаторы, зоны и риск по всем компаниям"""
+        multiples, warnings = self.calc_multiples()
+        result = pd.concat([
+            self.fair_price().rename('fair_price'),
+            multiples,
+            warnings.add_suffix(' зона'),
+            self.risk(warnings),
+        ], axis=1)
+        return result.sort_values(['risk_score', 'fair_price'], ascending=[True, False])
+
+
+if __name__ == "__main__":
+    # Пример: компания Полюс
+    data_polyus = CompanyData(
+        name="Полюс",
+        projected_net_profit=269.1,     # для справки
+        historical_pe=5,
+        shares_outstanding=0.1349,
+        revenue=603.2,
+        operating_expenses=223.3,
+        net_debt=622.7,
+        interest_rate=0.07,
+        total_assets=1200,
+        total_equity=550,
+        ebitda=370,
+        free_cash_flow=250,
+        market_cap=1600
+    )
+
+    print(f"Справедливая цена акций {data_polyus.name}: {data_polyus.fair_price()} руб")
+    multiples, warnings = data_polyus.calc_multiples()
+    print(f"Мультипликаторы {data_polyus.name}: {multiples}")
+    print(f"Предупреждения: {warnings}")
 
+    conclusions = data_polyus.interpret_warnings(warnings)
+    print("Выводы:")
+    for c in conclusions:
+        print(c)
 
-# Пример: компания Полюс
-data_polyus = CompanyData(
-    name="Полюс",
-    projected_net_profit=269.1,     # для справки
-    historical_pe=5,
-    shares_outstanding=0.1349,
-    revenue=603.2,
-    operating_expenses=223.3,
-    net_debt=622.7,
-    interest_rate=0.07,
-    total_assets=1200,
-    total_equity=550,
-    ebitda=370,
-    free_cash_flow=250,
-    market_cap=1600
-)
-
-print(f"Справедливая цена акций {data_polyus.name}: {data_polyus.fair_price()} руб")
-multiples, warnings = data_polyus.calc_multiples()
-print(f"Мультипликаторы {data_polyus.name}: {multiples}")
-print(f"Предупреждения: {warnings}")
-
-conclusions = data_polyus.interpret_warnings(warnings)
-print("Выводы:")
-for c in conclusions:
-    print(c)
-
-data_polyus.plot_multiples()
+    data_polyus.plot_multiples()
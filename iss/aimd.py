@@ -0,0 +1,136 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from iss.policy import is_retryable
+
+
+class TokenBucket:
+    """Глобальный лимит частоты запросов: rate в секунду, всплеск до burst"""
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.burst = burst or max(1.0, rate)
+        self._tokens = self.burst
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        """Забирает токен, возвращает сколько секунд нужно подождать до запроса"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            self._tokens -= 1
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    def acquire(self):
+        wait = self.reserve()
+        if wait:
+            time.sleep(wait)
+
+
+class AimdController:
+    """Адаптивный лимит одновременных запросов (AIMD).
+
+    Пока запросы успешны, быстрее latency_target и доля ошибок ниже
+    error_threshold, окно растет на increase за "круг" (window ответов).
+    На 429/5xx, таймауты и сетевые ошибки окно умножается на decrease,
+    не чаще раза за время обычного ответа, чтобы пачка одновременных
+    ошибок не обнулила окно. rate - дополнительный лимит запросов в секунду.
+    """
+
+    def __init__(self, initial=4, min_window=1, max_window=64, increase=1.0, decrease=0.5,
+                 latency_target=None, error_threshold=0.1, rate=None):
+        self.window = float(initial)
+        self.min_window = min_window
+        self.max_window = max_window
+        self.increase = increase
+        self.decrease = decrease
+        self.latency_target = latency_target
+        self.error_threshold = error_threshold
+        self.bucket = TokenBucket(rate) if rate else None
+
+        self.in_flight = 0
+        self.completed = 0
+        self.errors = 0
+        self.error_rate = 0.0
+        self.latency = None
+        self._started = time.monotonic()
+        self._last_decrease = 0.0
+        self._recent = deque(maxlen=1000)
+        self._cond = threading.Condition()
+
+    def try_acquire(self):
+        with self._cond:
+            if self.in_flight >= int(self.window):
+                return False
+            self.in_flight += 1
+            return True
+
+    def acquire(self):
+        """Занимает слот (ждет, пока окно позволит), затем токен лимита частоты"""
+        with self._cond:
+            while self.in_flight >= int(self.window):
+                self._cond.wait()
+            self.in_flight += 1
+        if self.bucket:
+            self.bucket.acquire()
+
+    async def acquire_async(self):
+        while not self.try_acquire():
+            await asyncio.sleep(0.01)
+        if self.bucket:
+            wait = self.bucket.reserve()
+            if wait:
+                await asyncio.sleep(wait)
+
+    def release(self, latency, error=None):
+        """Освобождает слот и подстраивает окно по результату запроса"""
+        now = time.monotonic()
+        overload = error is not None and is_retryable(error)
+        with self._cond:
+            self.in_flight -= 1
+            self.completed += 1
+            self._recent.append(now)
+            self.error_rate = 0.9 * self.error_rate + 0.1 * overload
+            if overload:
+                self.errors += 1
+                if now - self._last_decrease > (self.latency or 0.0):
+                    self.window = max(self.min_window, self.window * self.decrease)
+                    self._last_decrease = now
+            elif error is None:
+                self.latency = latency if self.latency is None else 0.8 * self.latency + 0.2 * latency
+                healthy = self.error_rate < self.error_threshold and (
+                    self.latency_target is None or self.latency <= self.latency_target)
+                if healthy:
+                    self.window = min(self.max_window, self.window + self.increase / self.window)
+            self._cond.notify_all()
+
+    def stats(self):
+        """Текущее окно, запросы в работе и пропускная способность за последние 10 с"""
+        now = time.monotonic()
+        with self._cond:
+            recent = sum(1 for t in self._recent if now - t <= 10)
+            return {
+                "window": round(self.window, 2),
+                "in_flight": self.in_flight,
+                "completed": self.completed,
+                "errors": self.errors,
+                "error_rate": round(self.error_rate, 3),
+                "latency": self.latency,
+                "throughput": recent / min(10.0, max(now - self._started, 1e-9)),
+            }
+
+
+def fan_out(fn, items, controller=None, max_workers=None):
+    """Выполняет fn(item) для всех items в пуле потоков, результаты - в исходном порядке.
+
+    Реальную одновременность запросов ограничивает controller, переданный
+    в RequestPolicy(controller=...) внутри fn; пул лишь не дает окну упереться в потоки.
+    """
+    workers = max_workers or (controller.max_window if controller else 8)
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="iss-fan-out") as pool:
+        return list(pool.map(fn, items))
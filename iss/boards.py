@@ -0,0 +1,148 @@
+import threading
+
+import pandas as pd
+
+from iss.cache import CACHE_DIR
+from iss.client import ISS_URL
+from iss.pages import iter_pages
+from iss.policy import IssError
+from iss.projection import get_blocks, records
+
+# Индекс SECID -> основной режим торгов (engine, market, board);
+# у неторгуемых бумаг (погашенных, исключенных) board пустой - их не запрашиваем
+BOARDS_PATH = CACHE_DIR / "boards.parquet"
+# Полная перестройка по листингу - раз в неделю, новые бумаги между
+# перестройками добираются точечными запросами по промахам
+MAX_AGE = pd.Timedelta(days=7)
+MARKETS = (("stock", "shares"), ("stock", "bonds"))
+
+_index = None
+_lock = threading.Lock()
+
+
+class BoardIndex:
+    """Сохраняемый на диск индекс SECID -> (engine, market, board)"""
+
+    def __init__(self, path=BOARDS_PATH, max_age=MAX_AGE):
+        self.path = path
+        self.max_age = max_age
+        self._missing = set()
+        self._lock = threading.Lock()
+        if self.path.exists():
+            self.frame = pd.read_parquet(self.path).set_index("secid")
+        else:
+            self.frame = pd.DataFrame({c: pd.Series(dtype=object) for c in ("engine", "market", "board")}
+                                      | {"updated": pd.Series(dtype="datetime64[ns]")},
+                                      index=pd.Index([], name="secid", dtype=object))
+
+    def __len__(self):
+        return len(self.frame)
+
+    @property
+    def stale(self):
+        return self.frame.empty or pd.Timestamp.now() - self.frame["updated"].min() > self.max_age
+
+    def refresh(self, markets=MARKETS, parallel=True):
+        """Перестраивает индекс одним проходом по листингам рынков"""
+        now = pd.Timestamp.now()
+        parts = []
+        for engine, market in markets:
+            url = f"{ISS_URL}/securities.json"
+            params = {"engine": engine, "market": market}
+            columns = ["secid", "primary_boardid", "is_traded"]
+            for page in iter_pages(url, params, parallel=parallel, columns=columns):
+                df = pd.DataFrame(page.get("data", []), columns=page.get("columns", []))
+                if df.empty:
+                    continue
+                board = df["primary_boardid"].where(df["is_traded"] == 1)
+                parts.append(pd.DataFrame({"secid": df["secid"], "engine": engine, "market": market,
+                                           "board": board, "updated": now}))
+        if not parts:
+            return 0
+        frame = pd.concat(parts, ignore_index=True).dropna(subset=["secid"])
+        # Бумага может встретиться в листинге нескольких рынков - берем первый,
+        # где она торгуется
+        traded = frame["board"].notna()
+        frame = pd.concat([frame[traded], frame[~traded]]).drop_duplicates("secid").set_index("secid")
+        with self._lock:
+            # Бумаги, найденные точечными запросами во время перестройки, сохраняем
+            extra = self.frame.loc[self.frame.index.difference(frame.index)]
+            self.frame = pd.concat([frame, extra]) if len(extra) else frame
+            self._missing.clear()
+        self.save()
+        return len(self.frame)
+
+    def lookup(self, secid):
+        """(engine, market, board) из индекса без запросов; None - нет в индексе или не торгуется"""
+        if secid not in self.frame.index:
+            return None
+        row = self.frame.loc[secid]
+        if pd.isna(row["board"]):
+            return None
+        return row["engine"], row["market"], row["board"]
+
+    def resolve(self, secid):
+        """(engine, market, board) бумаги; если ее нет в индексе - один запрос
+        securities/{secid}.json и добавление в индекс. None - бумаги нет на
+        бирже или она не торгуется.
+        """
+        if secid in self.frame.index or secid in self._missing:
+            return self.lookup(secid)
+        try:
+            data = get_blocks(f"{ISS_URL}/securities/{secid}.json",
+                              {"boards": ["boardid", "engine", "market", "is_primary", "is_traded"]})
+        except IssError as e:
+            print(f"{secid}: не удалось определить режим торгов — {e}")
+            return None
+        primary = [r for r in records(data, "boards") if r["is_primary"] == 1]
+        if not primary:
+            self._missing.add(secid)
+            return None
+        row = primary[0]
+        board = row["boardid"] if row["is_traded"] == 1 else None
+        with self._lock:
+            self.frame.loc[secid] = [row["engine"], row["market"], board, pd.Timestamp.now()]
+        self.save()
+        return self.lookup(secid)
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            self.frame.reset_index().to_parquet(self.path, index=False)
+
+
+def _rebuild(index):
+    try:
+        index.refresh()
+    except IssError as e:
+        print(f"Не удалось обновить индекс режимов торгов: {e}")
+
+
+def get_index():
+    """Общий индекс режимов с диска.
+
+    Устаревший индекс перестраивается в фоновом потоке, чтобы первый запрос
+    не ждал двух полных листингов; пока идет перестройка, промахи
+    разрешаются точечными запросами (BoardIndex.resolve).
+    """
+    global _index
+    with _lock:
+        if _index is None:
+            _index = BoardIndex()
+            if _index.stale:
+                threading.Thread(target=_rebuild, args=(_index,), name="iss-boards-refresh", daemon=True).start()
+        return _index
+
+
+def resolve(secid):
+    """(engine, market, board) основного режима бумаги или None"""
+    return get_index().resolve(secid)
+
+
+def security_url(secid, suffix=""):
+    """URL бумаги в ее основном режиме, например suffix="/candles"; None - бумаги нет"""
+    found = resolve(secid)
+    if found is None:
+        return None
+    engine, market, board = found
+    return f"{ISS_URL}/engines/{engine}/markets/{market}/boards/{board}/securities/{secid}{suffix}.json"
@@ -0,0 +1,160 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from pathlib import Path
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+# Каталог локальных данных (кэш ответов и прочие хранилища)
+CACHE_DIR = Path(os.environ.get("MOEX_CACHE_DIR", Path.home() / ".cache" / "moex"))
+# Предельный размер кэша ответов, при превышении удаляются давно не читанные записи
+MAX_BYTES = 256 * 1024 * 1024
+
+MINUTE = 60
+DAY = 24 * 60 * MINUTE
+
+# Время жизни ответа по пути запроса (первое совпадение), секунды.
+# Справочные данные живут сутки, торговые данные - секунды.
+TTL_RULES = [
+    (re.compile(r"/marketdata(_yields)?\.json$"), 15),
+    (re.compile(r"^/iss/engines/.+/securities(/[^/]+)?\.json$"), 15),
+    (re.compile(r"/description\.json$"), DAY),
+    (re.compile(r"/bondization\.json$"), DAY),
+    (re.compile(r"^/iss/securities(/[^/]+)?\.json$"), DAY),
+    (re.compile(r"/boards\.json$|^/iss/index\.json$"), 7 * DAY),
+]
+# Всё остальное не кэшируется
+DEFAULT_TTL = 0
+
+_force = threading.local()
+
+
+def ttl_for(url):
+    """TTL для запроса по правилам TTL_RULES"""
+    path = urlsplit(url).path
+    for pattern, ttl in TTL_RULES:
+        if pattern.search(path):
+            return ttl
+    return DEFAULT_TTL
+
+
+def make_key(url, params=None):
+    """Ключ кэша: url без регистра хоста + отсортированные параметры (из url и params)"""
+    parts = urlsplit(url)
+    query = parse_qsl(parts.query, keep_blank_values=True)
+    query += [(k, str(v)) for k, v in (params or {}).items()]
+    normalized = f"{parts.scheme}://{parts.netloc.lower()}{parts.path}?{urlencode(sorted(query))}"
+    return hashlib.sha1(normalized.encode()).hexdigest(), normalized
+
+
+@contextmanager
+def force_refresh():
+    """Внутри блока кэш не читается, ответы загружаются заново и перезаписываются"""
+    previous = getattr(_force, "on", False)
+    _force.on = True
+    try:
+        yield
+    finally:
+        _force.on = previous
+
+
+def is_forced():
+    return getattr(_force, "on", False)
+
+
+class ResponseCache:
+    """Кэш json-ответов ISS в SQLite с TTL и вытеснением давно не читанных (LRU)"""
+
+    def __init__(self, path, max_bytes=MAX_BYTES):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY, url TEXT, body BLOB, size INTEGER,"
+            " expires REAL, accessed REAL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses(accessed)")
+        self._conn.commit()
+
+    def get(self, key):
+        """Ответ по ключу или None, если записи нет или она устарела"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT body, expires FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or row[1] < now:
+                return None
+            self._conn.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+        return json.loads(zlib.decompress(row[0]))
+
+    def put(self, key, url, data, ttl):
+        body = zlib.compress(json.dumps(data, ensure_ascii=False).encode())
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                (key, url, body, len(body), now + ttl, now),
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Сначала устаревшие, затем давно не читанные
+        self._conn.execute("DELETE FROM responses WHERE expires < ?", (time.time(),))
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        victims = []
+        for key, size in self._conn.execute("SELECT key, size FROM responses ORDER BY accessed"):
+            if total <= self.max_bytes:
+                break
+            victims.append((key,))
+            total -= size
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", victims)
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+
+
+_cache = None
+
+
+def get_cache():
+    """Общий кэш в CACHE_DIR/iss.sqlite (None, если MOEX_CACHE=off)"""
+    global _cache
+    if os.environ.get("MOEX_CACHE", "on") == "off":
+        return None
+    if _cache is None:
+        _cache = ResponseCache(CACHE_DIR / "iss.sqlite")
+    return _cache
+
+
+def lookup(url, params=None):
+    """Ответ из кэша или None (в т.ч. внутри force_refresh)"""
+    cache = get_cache()
+    if cache is None or is_forced() or ttl_for(url) <= 0:
+        return None
+    return cache.get(make_key(url, params)[0])
+
+
+def store(url, params, data):
+    """Сохраняет ответ, если для этого запроса задан TTL"""
+    cache = get_cache()
+    ttl = ttl_for(url)
+    if cache is None or ttl <= 0:
+        return
+    key, normalized = make_key(url, params)
+    cache.put(key, normalized, data, ttl)
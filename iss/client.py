@@ -0,0 +1,77 @@
+import aiohttp
+import requests
+from requests.adapters import HTTPAdapter
+
+from iss import cache
+from iss.policy import DEFAULT_POLICY
+
+ISS_URL = "https://iss.moex.com/iss"
+
+# Размер пула соединений (keep-alive) к iss.moex.com
+POOL_SIZE = 16
+# Таймауты по умолчанию: (подключение, чтение), секунды
+TIMEOUT = (5, 30)
+
+HEADERS = {
+    "Accept-Encoding": "gzip, deflate",
+    "User-Agent": "Moex-parser",
+}
+
+_session = None
+
+
+def get_session():
+    """Общая requests-сессия: keep-alive, пул соединений, gzip"""
+    global _session
+    if _session is None:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=POOL_SIZE)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session.headers.update(HEADERS)
+        _session = session
+    return _session
+
+
+def get(url, params=None, timeout=TIMEOUT):
+    """GET-запрос к ISS через общую сессию"""
+    return get_session().get(url, params=params, timeout=timeout)
+
+
+def clip_timeout(timeout, remaining):
+    """Таймаут запроса, не выходящий за остаток дедлайна"""
+    if isinstance(timeout, tuple):
+        return tuple(min(t, remaining) for t in timeout)
+    return min(timeout, remaining)
+
+
+def get_json(url, params=None, timeout=TIMEOUT, force_refresh=False, policy=None):
+    """GET-запрос к ISS, возвращает разобранный json.
+
+    Справочные ответы берутся из локального кэша (iss.cache), пока не истек
+    их TTL; force_refresh=True - загрузить заново. Повторы и дедлайн задает
+    policy (iss.policy.RequestPolicy), при неудаче - исключение IssError.
+    """
+    if not force_refresh:
+        data = cache.lookup(url, params)
+        if data is not None:
+            return data
+
+    def fetch(remaining):
+        response = get(url, params=params, timeout=clip_timeout(timeout, remaining))
+        response.raise_for_status()
+        return response.json()
+
+    data = (policy or DEFAULT_POLICY).call(fetch, url)
+    cache.store(url, params, data)
+    return data
+
+
+def aiohttp_session():
+    """aiohttp-сессия с теми же настройками для асинхронных загрузок.
+
+    Создавать нужно внутри работающего event loop.
+    """
+    connector = aiohttp.TCPConnector(limit=POOL_SIZE, ttl_dns_cache=300)
+    timeout = aiohttp.ClientTimeout(total=TIMEOUT[1], sock_connect=TIMEOUT[0])
+    return aiohttp.ClientSession(connector=connector, timeout=timeout, headers=HEADERS)
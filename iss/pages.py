@@ -0,0 +1,190 @@
+import asyncio
+from collections import deque
+
+import aiohttp
+import pandas as pd
+import pyarrow as pa
+
+from iss import cache, client, projection
+from iss.client import aiohttp_session
+from iss.policy import DEFAULT_POLICY
+
+# Размер страницы ISS по умолчанию - 100 строк
+PAGE_SIZE = 100
+
+# Типы ISS (блок metadata при iss.meta=on) -> типы pandas.
+# Nullable-типы, чтобы у всех страниц были одинаковые dtypes
+ISS_DTYPES = {
+    "int32": "Int64",
+    "int64": "Int64",
+    "double": "Float64",
+    "string": "string",
+    "date": "string",
+    "time": "string",
+    "datetime": "string",
+}
+
+
+def to_frame(page):
+    """DataFrame из блока ISS (columns/data) с типами из metadata, если они есть"""
+    df = pd.DataFrame(page.get("data", []), columns=page.get("columns", []))
+    metadata = page.get("metadata") or {}
+    dtypes = {c: ISS_DTYPES[m["type"]] for c, m in metadata.items()
+              if c in df.columns and m.get("type") in ISS_DTYPES}
+    return df.astype(dtypes) if dtypes else df
+
+
+def _cursor(data, block):
+    """Блок cursor (INDEX, TOTAL, PAGESIZE) в виде словаря или None"""
+    cursor = data.get(f"{block}.cursor", {})
+    if not cursor.get("data"):
+        return None
+    return dict(zip(cursor["columns"], cursor["data"][0]))
+
+
+def _get_page(url, params, start):
+    # Повторы и дедлайн - в iss.policy, при неудаче поднимается IssError
+    return client.get_json(url, params={**params, "start": start})
+
+
+async def _fetch_page(session, semaphore, url, params, start):
+    """Загружает одну страницу выдачи ISS (смещение start)"""
+    page_params = {**params, "start": start}
+    data = cache.lookup(url, page_params)
+    if data is not None:
+        return data
+
+    async def fetch(remaining):
+        async with session.get(url, params=page_params,
+                               timeout=aiohttp.ClientTimeout(total=remaining)) as response:
+            response.raise_for_status()
+            # ISS иногда отдает json с content-type text/html
+            return await response.json(content_type=None)
+
+    async with semaphore:
+        data = await DEFAULT_POLICY.call_async(fetch, url)
+    cache.store(url, page_params, data)
+    return data
+
+
+async def _open_session():
+    return aiohttp_session()
+
+
+async def _close(session, tasks):
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    await session.close()
+
+
+def _iter_parallel(url, params, block, starts, max_concurrency):
+    """Страницы starts параллельно, но отдаются строго по порядку.
+
+    Вперед загружается не больше 2 * max_concurrency страниц, поэтому
+    память не зависит от размера выдачи. При ошибке оставшиеся страницы
+    дочитываются последовательно. Внутри уже работающего event loop
+    (Jupyter, Streamlit, aiohttp-код) свой loop не запустить - сразу
+    последовательный режим.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        pass
+    else:
+        for start in starts:
+            yield _get_page(url, params, start).get(block, {})
+        return
+
+    loop = asyncio.new_event_loop()
+    session = loop.run_until_complete(_open_session())
+    semaphore = asyncio.Semaphore(max_concurrency)
+    pending = deque()
+    queue = deque(starts)
+    abandoned = []
+    try:
+        while queue or pending:
+            while queue and len(pending) < 2 * max_concurrency:
+                start = queue.popleft()
+                task = loop.create_task(_fetch_page(session, semaphore, url, params, start))
+                pending.append((start, task))
+            start, task = pending.popleft()
+            try:
+                data = loop.run_until_complete(task)
+            except Exception as e:
+                print(f"Параллельная загрузка не удалась, обычный режим: {e}")
+                rest = [start] + [s for s, _ in pending] + list(queue)
+                abandoned.extend(t for _, t in pending)
+                pending.clear()
+                queue.clear()
+                for start in rest:
+                    yield _get_page(url, params, start).get(block, {})
+                return
+            yield data.get(block, {})
+    finally:
+        abandoned.extend(t for _, t in pending)
+        loop.run_until_complete(_close(session, abandoned))
+        loop.close()
+
+
+def iter_pages(url, params=None, block="securities", parallel=False, max_concurrency=8, columns=None):
+    """Генератор страниц выдачи ISS: отдает блок block (columns/data/metadata)
+    каждой страницы сразу по мере загрузки, без накопления всей выдачи.
+
+    parallel=True - по первой странице читается cursor (TOTAL/PAGESIZE),
+    остальные запрашиваются одновременно (не более max_concurrency) с
+    сохранением порядка. Без cursor - последовательный обход по start,
+    пока ISS не вернет пустую страницу.
+
+    columns - загружать только эти столбцы блока (iss.only/<блок>.columns,
+    iss.meta=off); они проверяются по сохраненным метаданным, которые
+    подставляются в каждую страницу.
+    """
+    params = dict(params or {})
+    metadata = None
+    if columns is not None:
+        metadata = projection.validate(url, {block: columns})[block]
+        params.update(projection.projection({block: columns}, cursor=True))
+    for page in _iter_pages(url, params, block, parallel, max_concurrency):
+        if metadata is not None and not page.get("metadata"):
+            page["metadata"] = metadata
+        yield page
+
+
+def _iter_pages(url, params, block, parallel, max_concurrency):
+    first = _get_page(url, params, 0)
+    page = first.get(block, {})
+    if not page.get("data"):
+        return
+    yield page
+
+    cursor = _cursor(first, block) if parallel else None
+    if cursor is not None:
+        page_size = cursor.get("PAGESIZE") or PAGE_SIZE
+        starts = range(page_size, cursor["TOTAL"], page_size)
+        yield from _iter_parallel(url, params, block, starts, max_concurrency)
+        return
+
+    start = PAGE_SIZE
+    while True:
+        page = _get_page(url, params, start).get(block, {})
+        # выход из цикла
+        if not page.get("data"):
+            break
+        yield page
+        start += PAGE_SIZE
+
+
+def iter_listing(market, engine="stock", parallel=False, max_concurrency=8, as_arrow=False, columns=None):
+    """Листинг рынка из /iss/securities.json страница за страницей.
+
+    Каждая страница (до 100 бумаг) отдается как DataFrame с типами из
+    метаданных ISS, при as_arrow=True - как pyarrow.RecordBatch.
+    columns - загружать только эти столбцы (например, ["secid", "is_traded"]).
+    """
+    # engine - указывает вид торговых операций
+    url = f"{client.ISS_URL}/securities.json"
+    params = {"engine": engine, "market": market}
+    for page in iter_pages(url, params, parallel=parallel, max_concurrency=max_concurrency, columns=columns):
+        df = to_frame(page)
+        yield pa.RecordBatch.from_pandas(df, preserve_index=False) if as_arrow else df
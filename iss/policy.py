@@ -0,0 +1,227 @@
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import aiohttp
+import requests
+
+
+class IssError(Exception):
+    """Запрос к ISS не удался (после всех повторов)"""
+
+    def __init__(self, message, url=None, attempts=0, status=None):
+        super().__init__(message)
+        self.url = url
+        self.attempts = attempts
+        self.status = status
+
+
+class IssHTTPError(IssError):
+    """ISS ответил ошибкой, которую бессмысленно повторять (4xx)"""
+
+
+class IssTimeoutError(IssError):
+    """Не уложились в дедлайн вызова"""
+
+
+def _status(error):
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        return error.response.status_code
+    if isinstance(error, aiohttp.ClientResponseError):
+        return error.status
+    return None
+
+
+def is_retryable(error):
+    """Повторяем сетевые ошибки, таймауты, 429/5xx и битый json (ISS отдает html при сбоях)"""
+    status = _status(error)
+    if status is not None:
+        return status == 429 or status >= 500
+    return isinstance(error, (requests.RequestException, aiohttp.ClientError,
+                              asyncio.TimeoutError, TimeoutError, ValueError))
+
+
+class LatencyTracker:
+    """Скользящее окно длительностей успешных запросов"""
+
+    def __init__(self, size=200):
+        self._samples = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def add(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def quantile(self, q, min_samples=20):
+        """Квантиль длительности или None, пока замеров меньше min_samples"""
+        with self._lock:
+            samples = sorted(self._samples)
+        if len(samples) < min_samples:
+            return None
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+
+_hedge_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="iss-hedge")
+
+
+class RequestPolicy:
+    """Политика запросов к ISS: ограниченные повторы с экспоненциальной
+    задержкой и jitter, общий дедлайн вызова и (опционально) hedging -
+    дублирующий запрос, если первый не ответил за p95 обычной длительности.
+    controller (iss.aimd.AimdController) ограничивает одновременные попытки.
+    """
+
+    def __init__(self, max_attempts=4, base_delay=0.5, max_delay=8.0, deadline=60.0,
+                 hedge=False, hedge_quantile=0.95, min_hedge_delay=0.2, controller=None):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+        self.hedge = hedge
+        self.hedge_quantile = hedge_quantile
+        self.min_hedge_delay = min_hedge_delay
+        self.controller = controller
+        self.latency = LatencyTracker()
+
+    def backoff(self, attempt):
+        """Пауза перед повтором attempt (с нуля): full jitter"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def hedge_delay(self):
+        """Через сколько секунд отправлять дубль, None - hedging пока не включаем"""
+        if not self.hedge:
+            return None
+        q = self.latency.quantile(self.hedge_quantile)
+        return None if q is None else max(q, self.min_hedge_delay)
+
+    def call(self, fn, url=None):
+        """Вызывает fn(remaining) с повторами; remaining - остаток дедлайна, секунды"""
+        started = time.monotonic()
+        error = None
+        attempts = 0
+        for attempt in range(self.max_attempts):
+            remaining = self.deadline - (time.monotonic() - started)
+            if remaining <= 0:
+                break
+            attempts += 1
+            try:
+                return self._attempt(fn, remaining)
+            except Exception as e:
+                if not is_retryable(e):
+                    # В IssError заворачиваем только ответы ISS; ошибки в fn пробрасываем как есть
+                    if _status(e) is None:
+                        raise
+                    raise IssHTTPError(f"{url}: {e}", url, attempts, _status(e)) from e
+                error = e
+            if attempt + 1 < self.max_attempts:
+                time.sleep(min(self.backoff(attempt), max(0.0, self.deadline - (time.monotonic() - started))))
+        raise self._failure(url, error, started, attempts)
+
+    async def call_async(self, fn, url=None):
+        """Асинхронный вариант call: fn(remaining) возвращает корутину"""
+        started = time.monotonic()
+        error = None
+        attempts = 0
+        for attempt in range(self.max_attempts):
+            remaining = self.deadline - (time.monotonic() - started)
+            if remaining <= 0:
+                break
+            attempts += 1
+            try:
+                return await self._attempt_async(fn, remaining)
+            except Exception as e:
+                if not is_retryable(e):
+                    # В IssError заворачиваем только ответы ISS; ошибки в fn пробрасываем как есть
+                    if _status(e) is None:
+                        raise
+                    raise IssHTTPError(f"{url}: {e}", url, attempts, _status(e)) from e
+                error = e
+            if attempt + 1 < self.max_attempts:
+                await asyncio.sleep(min(self.backoff(attempt), max(0.0, self.deadline - (time.monotonic() - started))))
+        raise self._failure(url, error, started, attempts)
+
+    def _failure(self, url, error, started, attempts):
+        if time.monotonic() - started >= self.deadline:
+            return IssTimeoutError(f"{url}: дедлайн {self.deadline} с истек ({error})", url, attempts, _status(error))
+        return IssError(f"{url}: не удалось после {attempts} попыток ({error})", url, attempts, _status(error))
+
+    def _attempt(self, fn, remaining):
+        if self.controller:
+            self.controller.acquire()
+        t0 = time.monotonic()
+        error = None
+        try:
+            result = self._hedged(fn, remaining)
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            if self.controller:
+                self.controller.release(time.monotonic() - t0, error)
+        self.latency.add(time.monotonic() - t0)
+        return result
+
+    async def _attempt_async(self, fn, remaining):
+        if self.controller:
+            await self.controller.acquire_async()
+        t0 = time.monotonic()
+        error = None
+        try:
+            result = await asyncio.wait_for(self._hedged_async(fn, remaining), remaining)
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            if self.controller:
+                self.controller.release(time.monotonic() - t0, error)
+        self.latency.add(time.monotonic() - t0)
+        return result
+
+    def _hedged(self, fn, remaining):
+        delay = self.hedge_delay()
+        if delay is None or delay >= remaining:
+            return fn(remaining)
+        started = time.monotonic()
+        futures = [_hedge_pool.submit(fn, remaining)]
+        done, _ = wait(futures, timeout=delay)
+        if not done:
+            futures.append(_hedge_pool.submit(fn, remaining - (time.monotonic() - started)))
+        # Первый успешный ответ выигрывает, ошибка - только если упали оба
+        pending = set(futures)
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    async def _hedged_async(self, fn, remaining):
+        delay = self.hedge_delay()
+        if delay is None or delay >= remaining:
+            return await fn(remaining)
+        started = time.monotonic()
+        tasks = {asyncio.ensure_future(fn(remaining))}
+        done, _ = await asyncio.wait(tasks, timeout=delay)
+        if not done:
+            tasks.add(asyncio.ensure_future(fn(remaining - (time.monotonic() - started))))
+        pending = tasks
+        error = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+
+DEFAULT_POLICY = RequestPolicy()
@@ -0,0 +1,107 @@
+import json
+import re
+import threading
+from urllib.parse import urlsplit
+
+from iss import client
+from iss.cache import CACHE_DIR
+
+# Метаданные блоков ISS (имя столбца -> тип) по шаблону URL, хранятся бессрочно:
+# при обращении к неизвестному столбцу перечитываются один раз
+METADATA_PATH = CACHE_DIR / "metadata.json"
+# SECID в пути заменяется на {secid}: метаданные у всех бумаг одного запроса общие
+_SECID = re.compile(r"/securities/[^/]+(?=(/[^/]+)?\.json$)")
+
+_metadata = None
+_lock = threading.Lock()
+
+
+def template(url):
+    """Шаблон запроса для метаданных: путь без хоста и конкретного SECID"""
+    return _SECID.sub("/securities/{secid}", urlsplit(url).path)
+
+
+def _load():
+    global _metadata
+    if _metadata is None:
+        _metadata = json.loads(METADATA_PATH.read_text()) if METADATA_PATH.exists() else {}
+    return _metadata
+
+
+def _save():
+    METADATA_PATH.parent.mkdir(parents=True, exist_ok=True)
+    METADATA_PATH.write_text(json.dumps(_metadata, ensure_ascii=False))
+
+
+def block_metadata(url, block, refresh=False):
+    """Метаданные блока {столбец: {"type": ...}}; без данных (iss.data=off), один раз на шаблон"""
+    key = template(url)
+    with _lock:
+        known = _load().get(key, {})
+        if block in known and not refresh:
+            return known[block]
+    params = {"iss.only": block, "iss.meta": "on", "iss.data": "off"}
+    data = client.get_json(url, params=params, force_refresh=refresh)
+    part = data.get(block, {})
+    metadata = part.get("metadata") or {c: {} for c in part.get("columns", [])}
+    with _lock:
+        _load().setdefault(key, {})[block] = metadata
+        _save()
+    return metadata
+
+
+def validate(url, columns):
+    """Проверяет столбцы {блок: [столбцы] или None - все} по метаданным.
+
+    Возвращает метаданные выбранных столбцов по блокам; неизвестный
+    столбец - ValueError (после одной попытки обновить метаданные).
+    """
+    result = {}
+    for block, names in columns.items():
+        metadata = block_metadata(url, block)
+        if names is not None and set(names) - metadata.keys():
+            metadata = block_metadata(url, block, refresh=True)
+        if names is None:
+            result[block] = metadata
+            continue
+        unknown = [n for n in names if n not in metadata]
+        if unknown:
+            raise ValueError(f"{template(url)}: в блоке {block} нет столбцов {unknown}; "
+                             f"есть: {', '.join(metadata)}")
+        result[block] = {n: metadata[n] for n in names}
+    return result
+
+
+def projection(columns, meta=False, cursor=False):
+    """Параметры запроса: только нужные блоки (iss.only) и столбцы (<блок>.columns)"""
+    blocks = list(columns)
+    if cursor:
+        blocks += [f"{b}.cursor" for b in columns]
+    params = {"iss.only": ",".join(blocks), "iss.meta": "on" if meta else "off"}
+    for block, names in columns.items():
+        if names is not None:
+            params[f"{block}.columns"] = ",".join(names)
+    return params
+
+
+def get_blocks(url, columns, params=None, meta=False, **kwargs):
+    """get_json только с блоками и столбцами из columns ({блок: [столбцы] или None}).
+
+    Столбцы проверяются по сохраненным метаданным; если ISS их не прислал
+    (iss.meta=off), метаданные подставляются в блоки из кэша, чтобы
+    iss.pages.to_frame типизировал столбцы. kwargs - как у client.get_json.
+    """
+    metadata = validate(url, columns)
+    data = client.get_json(url, params={**(params or {}), **projection(columns, meta)}, **kwargs)
+    for block, block_meta in metadata.items():
+        part = data.get(block)
+        if part is not None and not part.get("metadata"):
+            part["metadata"] = block_meta
+    return data
+
+
+def records(data, block=None):
+    """Строки блока в виде словарей {столбец: значение}; block=None - data уже блок"""
+    part = data if block is None else data.get(block) or {}
+    columns = part.get("columns", [])
+    return [dict(zip(columns, row)) for row in part.get("data", [])]
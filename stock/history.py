@@ -0,0 +1,107 @@
+import asyncio
+import datetime as dt
+
+import aiomoex
+import pandas as pd
+import pyarrow.parquet as pq
+
+from iss.aimd import AimdController
+from iss.cache import CACHE_DIR
+from iss.client import aiohttp_session
+from iss.policy import IssError, RequestPolicy
+from stock.parser import get_moex_securities
+
+# История торгов: <HISTORY_DIR>/<тикер>.parquet, по строке на торговый день
+HISTORY_DIR = CACHE_DIR / "history"
+COLUMNS = ("BOARDID", "TRADEDATE", "OPEN", "HIGH", "LOW", "CLOSE", "VOLUME", "VALUE")
+# Основной режим торгов акциями
+BOARDS = ("TQBR",)
+
+
+def history_path(ticker, root=HISTORY_DIR):
+    return root / f"{ticker}.parquet"
+
+
+def last_date(ticker, root=HISTORY_DIR):
+    """Последняя сохраненная TRADEDATE тикера (строка ГГГГ-ММ-ДД) или None"""
+    path = history_path(ticker, root)
+    if not path.exists():
+        return None
+    dates = pq.read_table(path, columns=["TRADEDATE"]).column("TRADEDATE")
+    return max(dates.to_pylist()) if len(dates) else None
+
+
+def load_history(ticker, root=HISTORY_DIR):
+    """Сохраненная история тикера, индекс - TRADEDATE (как в exp/1.py)"""
+    path = history_path(ticker, root)
+    if not path.exists():
+        return None
+    return pd.read_parquet(path).set_index("TRADEDATE")
+
+
+def share_tickers(boards=BOARDS):
+    """Торгуемые акции с основным режимом из boards: {тикер: режим}"""
+    shares = get_moex_securities("shares", columns=["secid", "is_traded", "primary_boardid"])
+    if shares is None:
+        return {}
+    shares = shares[(shares["is_traded"] == 1) & shares["primary_boardid"].isin(boards)]
+    return dict(zip(shares["secid"], shares["primary_boardid"]))
+
+
+def _append(ticker, rows, root):
+    new = pd.DataFrame(rows, columns=list(COLUMNS))
+    path = history_path(ticker, root)
+    if path.exists():
+        old = pd.read_parquet(path)
+        new = pd.concat([old, new[new["TRADEDATE"] > old["TRADEDATE"].max()]], ignore_index=True)
+    root.mkdir(parents=True, exist_ok=True)
+    new.to_parquet(path, index=False)
+
+
+async def _sync_one(session, policy, ticker, board, root):
+    last = last_date(ticker, root)
+    start = None if last is None else str(dt.date.fromisoformat(last) + dt.timedelta(days=1))
+
+    async def fetch(remaining):
+        return await aiomoex.get_board_history(session, ticker, start=start, columns=COLUMNS, board=board)
+
+    rows = await policy.call_async(fetch, f"history/{board}/{ticker}")
+    if rows:
+        _append(ticker, rows, root)
+    return len(rows)
+
+
+async def _sync(tickers, root, max_concurrency):
+    # Одна aiohttp-сессия на все тикеры, одновременность подбирает AIMD-контроллер
+    controller = AimdController(initial=min(4, max_concurrency), max_window=max_concurrency)
+    # Первая загрузка тикера - годы истории в несколько страниц, дедлайн с запасом
+    policy = RequestPolicy(controller=controller, deadline=300)
+    async with aiohttp_session() as session:
+        results = await asyncio.gather(
+            *[_sync_one(session, policy, t, board, root) for t, board in tickers.items()],
+            return_exceptions=True,
+        )
+    added = {}
+    for ticker, result in zip(tickers, results):
+        if isinstance(result, IssError):
+            print(f"{ticker}: не удалось загрузить историю — {result}")
+        elif isinstance(result, BaseException):
+            raise result
+        else:
+            added[ticker] = result
+    return added
+
+
+def sync_history(tickers=None, root=HISTORY_DIR, max_concurrency=8):
+    """Догружает дневную историю торгов по всем акциям (или по tickers).
+
+    tickers - список тикеров (режим TQBR) или словарь {тикер: режим}; по
+    умолчанию все торгуемые акции из get_moex_securities("shares"). Для
+    каждого тикера запрашиваются только даты после последней сохраненной
+    TRADEDATE. Возвращает {тикер: число добавленных строк}.
+    """
+    if tickers is None:
+        tickers = share_tickers()
+    elif not isinstance(tickers, dict):
+        tickers = {t: BOARDS[0] for t in tickers}
+    return asyncio.run(_sync(tickers, root, max_concurrency))
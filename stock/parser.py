@@ -1,48 +1,68 @@
-import time
-import requests
 import pandas as pd
 
+from iss.boards import security_url
+from iss.pages import iter_listing
+from iss.policy import IssError
+from iss.projection import get_blocks
+
 
 # Настройки pandas для отображения всех столбцов
 pd.set_option('display.max_columns', None)
 pd.set_option('display.width', 200)
 
-def get_moex_securities(market):
+def iter_moex_securities(market, parallel=False, max_concurrency=8, as_arrow=False, columns=None):
+    """Генератор листинга по рынку (см. iss.pages.iter_listing)"""
+    # Формат URL для получения данных от API Мосбиржи:
+    # https://iss.moex.com/iss/securities.json?engine=stock&market={market}
+    return iter_listing(market, parallel=parallel, max_concurrency=max_concurrency,
+                        as_arrow=as_arrow, columns=columns)
+
+
+def get_moex_securities(market, parallel=False, max_concurrency=8, columns=None):
     """Функия получения данных от API Мсбиржи"""
     # Получаем данные по указанному рынку (расширенный формат)
     # Максимальное число получаемых записей в одном запросе - 100
-    # Получаем данные построчно, пока не закончатся данные по рынку
+    # Страницы отдает iter_moex_securities, здесь они только склеиваются
     # Если результат пустой, возвращаем None
-
-    # Формат URL для получения данных от API Мосбиржи:
-    # https://iss.moex.com/iss/securities.json?engine=stock&market={market}
-    # engine - указывает вид торговых операций
-    url = f"https://iss.moex.com/iss/securities.json?engine=stock&market={market}"
-    all_data = []
-    start = 0
-
-    while True:
-        try:
-            response = requests.get(f"{url}&start={start}", timeout=30)
-            # timeout=30 выбран опытным путем
-            data = response.json()
-        except requests.exceptions.RequestException as e:
-            print(f"Ошибка подключения:  - выключи vpn {e}")
-            time.sleep(5)  # Пауза перед повтором
-            continue
-
-        columns = data.get('securities').get('columns')
-        rows = data.get('securities').get('data')
-        # выход из цикла
-        if not rows:
-            break
-        # добавляем полученные данные в общий список
-        all_data.extend(rows)
-        start += 100
-
-    if not all_data:
+    # parallel=True - страницы запрашиваются одновременно (не более max_concurrency)
+    # columns - только нужные столбцы листинга
+    chunks = list(iter_moex_securities(market, parallel, max_concurrency, columns=columns))
+    if not chunks:
         return None
 
-    df = pd.DataFrame(all_data, columns=columns)
+    df = pd.concat(chunks, ignore_index=True)
     return df
 
+
+def get_security_details(s, board=None, columns=None, marketdata_columns=None):
+    """Данные бумаги (блоки securities и marketdata) в ее основном режиме торгов.
+
+    columns / marketdata_columns - только эти столбцы блоков (None - все).
+    """
+    # Режим берется из индекса iss.boards: TQBR для акций, TQTF для фондов и т.д.
+    if board is None:
+        url = security_url(s)
+        if url is None:
+            print(f"Нет данных для {s}")
+            return None
+    else:
+        url = f"https://iss.moex.com/iss/engines/stock/markets/shares/boards/{board}/securities/{s}.json"
+    try:
+        data = get_blocks(url, {"securities": columns, "marketdata": marketdata_columns})
+    except IssError as e:
+        print(f"Ошибка при получении данных для {s}: {e}")
+        return None
+
+    rows = data['securities']['data']
+    if not rows:
+        print(f"Нет данных для {s}")
+        return None
+
+    df = pd.DataFrame(rows, columns=data['securities']['columns'])
+    market = data.get('marketdata', {})
+    if market.get('data'):
+        md = pd.DataFrame(market['data'], columns=market['columns'])
+        # Запрос по одному режиму - по строке в каждом блоке, склеиваем построчно
+        md = md.drop(columns=["SECID", "BOARDID"], errors="ignore")
+        df = df.join(md, rsuffix="_marketdata")
+    return df
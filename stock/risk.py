@@ -0,0 +1,164 @@
+from statistics import NormalDist
+
+import numpy as np
+
+from store.candles import CANDLES_DIR, CandleStore
+
+# Матрицы везде (даты x тикеры), NaN - не было торгов
+TRADING_DAYS = 252
+LAMBDA = 0.94  # RiskMetrics для дневных данных
+
+
+def close_matrix(start=None, end=None, tickers=None, root=CANDLES_DIR):
+    """Матрица цен закрытия из хранилища свечей: (даты, тикеры, matrix)"""
+    store = CandleStore(root)
+    rows = store.rows(start, end)
+    close = store.field("CLOSE")[rows]
+    names = store.tickers
+    if tickers is not None:
+        columns = [store.tickers.index(t) for t in tickers]
+        close, names = close[:, columns], list(tickers)
+    return store.dates[rows], names, close
+
+
+def log_returns(close, last=None):
+    """Логарифмические доходности к последней известной цене.
+
+    Для неликвидных бумаг доходность за пропуск относится на день
+    следующей сделки; в дни без сделок - NaN. last - цены перед первой
+    строкой (для наращивания по дням).
+    """
+    close = np.asarray(close, dtype=float)
+    prev = np.empty_like(close)
+    prev[0] = np.nan if last is None else last
+    prev[1:] = close[:-1]
+    # Протягиваем последнюю известную цену вниз по пропускам
+    valid = ~np.isnan(prev)
+    idx = np.where(valid, np.arange(len(prev))[:, None], 0)
+    np.maximum.accumulate(idx, axis=0, out=idx)
+    prev = prev[idx, np.arange(prev.shape[1])]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.log(close / prev)
+
+
+def rolling_vol(returns, window=20, min_periods=None, annualize=TRADING_DAYS):
+    """Скользящая годовая волатильность по тикерам; первые window-1 строк - NaN"""
+    min_periods = window if min_periods is None else min_periods
+    mask = ~np.isnan(returns)
+    x = np.where(mask, returns, 0.0)
+    zero = np.zeros((1, x.shape[1]))
+    s1 = np.concatenate([zero, np.cumsum(x, axis=0)])
+    s2 = np.concatenate([zero, np.cumsum(x * x, axis=0)])
+    n = np.concatenate([zero, np.cumsum(mask, axis=0)])
+    s1 = s1[window:] - s1[:-window]
+    s2 = s2[window:] - s2[:-window]
+    n = n[window:] - n[:-window]
+
+    out = np.full(returns.shape, np.nan)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        var = (s2 - s1 * s1 / n) / (n - 1)
+    var = np.where(n >= max(min_periods, 2), np.maximum(var, 0.0), np.nan)
+    out[window - 1:] = np.sqrt(var * annualize)
+    return out
+
+
+def cov_matrix(returns, min_periods=2):
+    """Ковариации по попарно общим наблюдениям (выборочные, без annualize)"""
+    mask = (~np.isnan(returns)).astype(float)
+    x = np.where(mask > 0, returns, 0.0)
+    n = mask.T @ mask
+    sx = x.T @ mask  # sx[i, j] - сумма x_i по дням, где есть и x_j
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cov = (x.T @ x - sx * sx.T / n) / (n - 1)
+    cov[n < min_periods] = np.nan
+    return cov
+
+
+def rolling_cov(returns, window=60, min_periods=None):
+    """Ковариации за последние window дней"""
+    return cov_matrix(returns[-window:], window // 2 if min_periods is None else min_periods)
+
+
+def corr_matrix(cov):
+    """Корреляции из ковариаций"""
+    std = np.sqrt(np.diag(cov))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return cov / np.outer(std, std)
+
+
+class EwmaRisk:
+    """EWMA-ковариации (RiskMetrics), обновляемые по одному дню.
+
+    Пара тикеров обновляется только в дни, когда торговались оба;
+    веса накапливаются отдельно по парам, поэтому оценка не занижена
+    на коротких историях.
+    """
+
+    def __init__(self, n, lam=LAMBDA):
+        self.lam = lam
+        self.sums = np.zeros((n, n))
+        self.weights = np.zeros((n, n))
+        self.last = np.full(n, np.nan)
+        self.days = 0
+
+    @classmethod
+    def from_close(cls, close, lam=LAMBDA):
+        close = np.asarray(close, dtype=float)
+        risk = cls(close.shape[1], lam)
+        risk.update_returns(log_returns(close))
+        risk.last = _last_valid(close, risk.last)
+        return risk
+
+    def add_day(self, close):
+        """Добавляет цены закрытия нового дня (NaN - не торговался)"""
+        close = np.asarray(close, dtype=float)[None, :]
+        self.update_returns(log_returns(close, self.last))
+        self.last = _last_valid(close, self.last)
+
+    def update_returns(self, returns):
+        """Учитывает строки доходностей по порядку"""
+        lam = self.lam
+        for r in np.atleast_2d(returns):
+            valid = ~np.isnan(r)
+            if not valid.any():
+                continue
+            pair = np.outer(valid, valid)
+            x = np.where(valid, r, 0.0)
+            self.sums[pair] = lam * self.sums[pair] + (1 - lam) * np.outer(x, x)[pair]
+            self.weights[pair] = lam * self.weights[pair] + (1 - lam)
+            self.days += 1
+
+    @property
+    def cov(self):
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(self.weights > 0, self.sums / self.weights, np.nan)
+
+    @property
+    def corr(self):
+        return corr_matrix(self.cov)
+
+    def vol(self, annualize=TRADING_DAYS):
+        return np.sqrt(np.diag(self.cov) * annualize)
+
+
+def _last_valid(close, last):
+    """Последняя известная цена по каждому тикеру"""
+    valid = ~np.isnan(close)
+    has = valid.any(axis=0)
+    idx = close.shape[0] - 1 - np.argmax(valid[::-1], axis=0)
+    out = last.copy()
+    out[has] = close[idx[has], np.flatnonzero(has)]
+    return out
+
+
+def parametric_var(weights, cov, confidence=0.99, value=1.0, horizon=1):
+    """Параметрический (нормальный) VaR портфеля; бумаги без ковариаций - NaN"""
+    weights = np.asarray(weights, dtype=float)
+    sigma = np.sqrt(weights @ cov @ weights * horizon)
+    return NormalDist().inv_cdf(confidence) * sigma * value
+
+
+def historical_var(weights, returns, confidence=0.99, value=1.0):
+    """Исторический VaR: дни без сделок по бумаге дают ей нулевую доходность"""
+    pnl = np.expm1(np.nan_to_num(returns)) @ np.asarray(weights, dtype=float) * value
+    return -np.quantile(pnl, 1 - confidence)
@@ -0,0 +1,120 @@
+import json
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from iss.cache import CACHE_DIR
+from stock.history import HISTORY_DIR, load_history
+
+# Хранилище свечей: <root>/dates.npy (datetime64[D]), <root>/tickers.json,
+# <root>/<FIELD>.npy - матрица (даты x тикеры) float64, NaN - нет торгов.
+# Матрицы открываются через mmap, строка - срез по всем тикерам на дату,
+# столбец - история тикера; оба чтения - представления без копирования.
+CANDLES_DIR = CACHE_DIR / "candles"
+FIELDS = ("OPEN", "HIGH", "LOW", "CLOSE", "VOLUME", "VALUE")
+DTYPE = np.float64
+
+
+def build(tickers=None, source=HISTORY_DIR, root=CANDLES_DIR):
+    """Собирает хранилище из Parquet-истории stock.history (целиком заново).
+
+    Возвращает число (дат, тикеров).
+    """
+    if tickers is None:
+        tickers = sorted(p.stem for p in source.glob("*.parquet"))
+    frames = {}
+    for ticker in tickers:
+        df = load_history(ticker, source)
+        if df is not None and len(df):
+            frames[ticker] = df
+    tickers = list(frames)
+    if not tickers:
+        dates = np.array([], dtype="datetime64[D]")
+    else:
+        dates = np.unique(np.concatenate([
+            df.index.to_numpy().astype("datetime64[D]") for df in frames.values()
+        ]))
+
+    tmp = root.with_name(root.name + ".tmp")
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+    np.save(tmp / "dates.npy", dates)
+    (tmp / "tickers.json").write_text(json.dumps(tickers))
+
+    shape = (len(dates), len(tickers))
+    arrays = {
+        field: np.lib.format.open_memmap(tmp / f"{field}.npy", mode="w+", dtype=DTYPE, shape=shape)
+        for field in FIELDS
+    }
+    for array in arrays.values():
+        array[:] = np.nan
+    for j, df in enumerate(frames.values()):
+        rows = np.searchsorted(dates, df.index.to_numpy().astype("datetime64[D]"))
+        for field in FIELDS:
+            if field in df.columns:
+                arrays[field][rows, j] = df[field].to_numpy(dtype=DTYPE, na_value=np.nan)
+    for array in arrays.values():
+        array.flush()
+    del arrays
+
+    # Подмена каталога целиком, чтобы читатели не видели полузаписанных файлов
+    old = root.with_name(root.name + ".old")
+    shutil.rmtree(old, ignore_errors=True)
+    if root.exists():
+        root.rename(old)
+    tmp.rename(root)
+    shutil.rmtree(old, ignore_errors=True)
+    return shape
+
+
+class CandleStore:
+    """Чтение хранилища свечей через mmap"""
+
+    def __init__(self, root=CANDLES_DIR):
+        self.root = root
+        self.dates = np.load(root / "dates.npy")
+        self.tickers = json.loads((root / "tickers.json").read_text())
+        self._columns = {t: j for j, t in enumerate(self.tickers)}
+        self._fields = {}
+
+    def __len__(self):
+        return len(self.dates)
+
+    def field(self, name):
+        """Матрица поля (даты x тикеры) только для чтения"""
+        if name not in self._fields:
+            self._fields[name] = np.load(self.root / f"{name}.npy", mmap_mode="r")
+        return self._fields[name]
+
+    def rows(self, start=None, end=None):
+        """Срез строк [start, end] по датам (включительно)"""
+        lo = 0 if start is None else np.searchsorted(self.dates, np.datetime64(start, "D"), "left")
+        hi = len(self.dates) if end is None else np.searchsorted(self.dates, np.datetime64(end, "D"), "right")
+        return slice(int(lo), int(hi))
+
+    def series(self, ticker, field="CLOSE", start=None, end=None):
+        """История поля по тикеру за период - представление без копирования"""
+        return self.field(field)[self.rows(start, end), self._columns[ticker]]
+
+    def cross_section(self, date, field="CLOSE"):
+        """Значения поля по всем тикерам на дату; None, если торгов не было"""
+        date = np.datetime64(date, "D")
+        i = np.searchsorted(self.dates, date)
+        if i == len(self.dates) or self.dates[i] != date:
+            return None
+        return self.field(field)[i]
+
+    def window(self, field="CLOSE", start=None, end=None):
+        """Матрица поля за период по всем тикерам - представление без копирования"""
+        return self.field(field)[self.rows(start, end)]
+
+    def history(self, ticker, start=None, end=None):
+        """OHLCV тикера за период в виде DataFrame (индекс TRADEDATE)"""
+        rows = self.rows(start, end)
+        j = self._columns[ticker]
+        df = pd.DataFrame(
+            {field: self.field(field)[rows, j] for field in FIELDS},
+            index=pd.Index(self.dates[rows], name="TRADEDATE"),
+        )
+        return df.dropna(how="all")
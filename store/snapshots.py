@@ -0,0 +1,140 @@
+import datetime as dt
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from bonds.parser import get_moex_bonds
+from iss.cache import CACHE_DIR
+from stock.parser import get_moex_securities
+
+# Снимки листингов: <root>/snapshots/market=<m>/date=<YYYY-MM-DD>/data.parquet
+# Изменения к прошлому снимку: <root>/diffs/market=<m>/date=<YYYY-MM-DD>/diff.parquet
+STORE_DIR = CACHE_DIR / "store"
+KEY = "secid"
+HASH_COLUMN = "_row_hash"
+
+
+def _partition(root, kind, market, date):
+    return root / kind / f"market={market}" / f"date={date}"
+
+
+def row_hashes(df, key=KEY):
+    """Хэш каждой строки по всем полям, кроме ключа (uint64)"""
+    values = df.drop(columns=[key, HASH_COLUMN], errors="ignore").astype(str)
+    return pd.util.hash_pandas_object(values, index=False).to_numpy()
+
+
+def list_dates(market, root=STORE_DIR):
+    """Даты сохраненных снимков рынка по возрастанию"""
+    path = root / "snapshots" / f"market={market}"
+    if not path.exists():
+        return []
+    return sorted(p.name.split("=", 1)[1] for p in path.glob("date=*") if (p / "data.parquet").exists())
+
+
+def diff_snapshots(old, new, key=KEY):
+    """Построчная разница двух снимков по хэшам строк.
+
+    Возвращает DataFrame: key, change (new/delisted/changed), changed_fields -
+    перечень изменившихся полей через запятую для change=changed.
+    """
+    new_hash = pd.Series(new[HASH_COLUMN].to_numpy(), index=new[key].to_numpy())
+    old_hash = pd.Series(old[HASH_COLUMN].to_numpy(), index=old[key].to_numpy())
+
+    added = new_hash.index.difference(old_hash.index)
+    removed = old_hash.index.difference(new_hash.index)
+    common = new_hash.index.intersection(old_hash.index)
+    changed = common[new_hash[common].to_numpy() != old_hash[common].to_numpy()]
+
+    fields = []
+    if len(changed):
+        columns = [c for c in new.columns if c not in (key, HASH_COLUMN) and c in old.columns]
+        a = new.set_index(key).loc[changed, columns].astype(str)
+        b = old.set_index(key).loc[changed, columns].astype(str)
+        mask = (a != b).to_numpy()
+        fields = [",".join(c for c, m in zip(columns, row) if m) for row in mask]
+
+    return pd.DataFrame({
+        key: list(added) + list(removed) + list(changed),
+        "change": ["new"] * len(added) + ["delisted"] * len(removed) + ["changed"] * len(changed),
+        "changed_fields": [""] * (len(added) + len(removed)) + fields,
+    })
+
+
+def save_snapshot(df, market, date=None, root=STORE_DIR, key=KEY):
+    """Сохраняет листинг в Parquet и возвращает разницу с предыдущим снимком.
+
+    Разница тоже сохраняется, её можно прочитать через load_diff.
+    """
+    date = str(date or dt.date.today())
+    df = df.drop_duplicates(key).reset_index(drop=True)
+    df[HASH_COLUMN] = row_hashes(df, key)
+
+    path = _partition(root, "snapshots", market, date)
+    path.mkdir(parents=True, exist_ok=True)
+    pq.write_table(pa.Table.from_pandas(df, preserve_index=False), path / "data.parquet")
+
+    previous = [d for d in list_dates(market, root) if d < date]
+    if previous:
+        diff = diff_snapshots(load_snapshot(market, previous[-1], root=root), df, key)
+    else:
+        diff = pd.DataFrame({key: df[key], "change": "new", "changed_fields": ""})
+
+    path = _partition(root, "diffs", market, date)
+    path.mkdir(parents=True, exist_ok=True)
+    pq.write_table(pa.Table.from_pandas(diff, preserve_index=False), path / "diff.parquet")
+    return diff
+
+
+def load_snapshot(market, date=None, columns=None, keys=None, root=STORE_DIR, key=KEY):
+    """Снимок рынка на дату (по умолчанию последний).
+
+    columns - читать только эти поля, keys - только эти бумаги
+    (фильтр применяется при чтении Parquet).
+    """
+    dates = list_dates(market, root)
+    if not dates:
+        return None
+    date = str(date or dates[-1])
+    if columns is not None:
+        columns = list(dict.fromkeys([key, *columns]))
+    path = _partition(root, "snapshots", market, date) / "data.parquet"
+    if keys is not None:
+        keys = list(keys)
+        if not keys:
+            # Пустой список pyarrow не может сопоставить с типом ключа - пустой снимок без чтения
+            schema = pq.read_schema(path)
+            if columns is not None:
+                schema = pa.schema([schema.field(c) for c in columns])
+            return schema.empty_table().to_pandas()
+    # Фильтр по ключам уходит в pyarrow: группы строк без нужных бумаг не читаются
+    filters = None if keys is None else [(key, "in", keys)]
+    return pq.read_table(path, columns=columns, filters=filters).to_pandas()
+
+
+def load_diff(market, date=None, root=STORE_DIR):
+    """Разница снимка на дату (по умолчанию последнего) с предыдущим"""
+    dates = list_dates(market, root)
+    if not dates:
+        return None
+    date = str(date or dates[-1])
+    return pq.read_table(_partition(root, "diffs", market, date) / "diff.parquet").to_pandas()
+
+
+def load_delta(market, date=None, columns=None, root=STORE_DIR, key=KEY):
+    """Только новые и изменившиеся бумаги снимка (delisted в снимке уже нет)"""
+    diff = load_diff(market, date, root=root)
+    if diff is None:
+        return None
+    keys = diff.loc[diff["change"] != "delisted", key]
+    return load_snapshot(market, date, columns=columns, keys=keys, root=root, key=key)
+
+
+def refresh(market, date=None, root=STORE_DIR):
+    """Загружает листинг рынка с ISS, сохраняет снимок и возвращает разницу"""
+    get_listing = get_moex_bonds if market == "bonds" else get_moex_securities
+    df = get_listing(market)
+    if df is None:
+        return None
+    return save_snapshot(df, market, date, root=root)
@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+
+from bonds.analytics import bond_analytics, cash_flow_grid
+
+SETTLE = pd.Timestamp("2026-10-18")
+
+
+def _ofz(price_column, yield_column):
+    df = pd.DataFrame({
+        "SECID": ["SU26238RMFS4", "SU26240RMFS0"],
+        "FACEVALUE": [1000.0, 1000.0],
+        "COUPONVALUE": [35.4, 34.9],
+        "COUPONPERIOD": [182, 182],
+        "NEXTCOUPON": ["2027-01-20", "2027-03-10"],
+        "MATDATE": ["2041-05-15", "2036-07-30"],
+        "ACCRUEDINT": [10.5, 5.2],
+    })
+    times, flows, _ = cash_flow_grid(df, SETTLE)
+    exchange = np.array([0.14, 0.145])
+    dirty = (flows * (1 + exchange)[:, None] ** -times).sum(axis=1)
+    df[price_column] = (dirty - df["ACCRUEDINT"]) / 10
+    df[yield_column] = exchange * 100
+    return df
+
+
+def test_exchange_yield_from_marketdata_yields():
+    result = bond_analytics(_ofz("PRICE", "EFFECTIVEYIELD"), SETTLE)
+    assert (result["price_source"] == "PRICE").all()
+    np.testing.assert_allclose(result["exchange_yield"], [14.0, 14.5])
+    np.testing.assert_allclose(result["ytm"], result["exchange_yield"], atol=1e-6)
+
+
+def test_exchange_yield_at_waprice():
+    result = bond_analytics(_ofz("WAPRICE", "EFFECTIVEYIELDWAPRICE"), SETTLE)
+    assert (result["price_source"] == "WAPRICE").all()
+    np.testing.assert_allclose(result["exchange_yield"], [14.0, 14.5])
+
+
+def _par_bond(next_coupon, settle_date=None):
+    df = pd.DataFrame({
+        "SECID": ["RU000A0ZZZZ0"],
+        "FACEVALUE": [1000.0],
+        "COUPONVALUE": [40.0],
+        "COUPONPERIOD": [182],
+        "NEXTCOUPON": [next_coupon],
+        "MATDATE": ["2031-10-12"],
+        "ACCRUEDINT": [0.0],
+        "PRICE": [100.0],
+    })
+    if settle_date is not None:
+        df["SETTLEDATE"] = settle_date
+    return df
+
+
+def test_coupon_on_settle_date_rolls_to_next_period():
+    # NEXTCOUPON не сдвинут после выплаты: купон в дату расчетов уже не получить,
+    # остальные купоны графика остаются
+    stale = bond_analytics(_par_bond("2026-10-18"), SETTLE)
+    rolled = bond_analytics(_par_bond("2027-04-18"), SETTLE)
+    np.testing.assert_allclose(stale["ytm"], rolled["ytm"])
+    assert 8.0 < stale["ytm"].iloc[0] < 8.5
+
+
+def test_settle_defaults_to_settledate():
+    df = _par_bond("2027-01-20", "2026-10-19")
+    np.testing.assert_allclose(bond_analytics(df)["ytm"], bond_analytics(df, "2026-10-19")["ytm"])
+    times, _, _ = cash_flow_grid(df)
+    assert np.isclose(times[0, 0] * 365, 93)
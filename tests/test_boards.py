@@ -0,0 +1,47 @@
+from iss import boards
+from iss.boards import BoardIndex
+
+LISTINGS = {
+    "shares": [["SBER", "TQBR", 1]],
+    "bonds": [["SU26238RMFS4", "TQOB", 1], ["RU000A0JQRD9", "TQCB", 0]],
+}
+
+
+def _pages(url, params, parallel=False, columns=None):
+    yield {"columns": columns, "data": LISTINGS[params["market"]]}
+
+
+def test_non_traded_securities_resolve_without_requests(tmp_path, monkeypatch):
+    requested = []
+
+    def get_blocks(url, columns):
+        requested.append(url)
+        return {"boards": {"columns": columns["boards"], "data": []}}
+
+    monkeypatch.setattr(boards, "iter_pages", _pages)
+    monkeypatch.setattr(boards, "get_blocks", get_blocks)
+    index = BoardIndex(path=tmp_path / "boards.parquet")
+    assert index.refresh() == 3
+
+    assert index.resolve("SU26238RMFS4") == ("stock", "bonds", "TQOB")
+    assert index.resolve("RU000A0JQRD9") is None
+    assert requested == []
+
+    # Признак неторгуемой бумаги сохраняется на диск
+    assert BoardIndex(path=tmp_path / "boards.parquet").resolve("RU000A0JQRD9") is None
+    assert requested == []
+
+
+def test_unknown_security_is_looked_up_once(tmp_path, monkeypatch):
+    requested = []
+
+    def get_blocks(url, columns):
+        requested.append(url)
+        data = [["TQCB", "stock", "bonds", 1, 0], ["TQRD", "stock", "bonds", 0, 0]]
+        return {"boards": {"columns": columns["boards"], "data": data}}
+
+    monkeypatch.setattr(boards, "get_blocks", get_blocks)
+    index = BoardIndex(path=tmp_path / "boards.parquet")
+    assert index.resolve("RU000A0ZZZZ0") is None
+    assert index.resolve("RU000A0ZZZZ0") is None
+    assert len(requested) == 1
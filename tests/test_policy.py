@@ -0,0 +1,42 @@
+import pytest
+import requests
+
+from iss.policy import IssHTTPError, IssTimeoutError, RequestPolicy
+
+
+def _http_error(status):
+    response = requests.Response()
+    response.status_code = status
+    return requests.HTTPError(str(status), response=response)
+
+
+def test_programming_error_is_not_wrapped():
+    def fn(remaining):
+        return {}["marketdata"]
+
+    with pytest.raises(KeyError):
+        RequestPolicy().call(fn, "url")
+
+
+def test_client_error_is_not_retried():
+    calls = []
+
+    def fn(remaining):
+        calls.append(remaining)
+        raise _http_error(404)
+
+    with pytest.raises(IssHTTPError) as info:
+        RequestPolicy().call(fn, "url")
+    assert (info.value.status, info.value.attempts, len(calls)) == (404, 1, 1)
+
+
+def test_deadline_reports_attempts_made(monkeypatch):
+    monkeypatch.setattr("iss.policy.random.uniform", lambda a, b: b)
+
+    def fn(remaining):
+        raise requests.ConnectionError("down")
+
+    policy = RequestPolicy(max_attempts=10, base_delay=0.3, max_delay=0.3, deadline=0.5)
+    with pytest.raises(IssTimeoutError) as info:
+        policy.call(fn, "url")
+    assert info.value.attempts == 2
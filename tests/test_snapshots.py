@@ -0,0 +1,36 @@
+import pandas as pd
+
+from store.snapshots import load_delta, load_snapshot, save_snapshot
+
+
+def _listing():
+    return pd.DataFrame({
+        "secid": ["SU26238RMFS4", "RU000A0JX0J2"],
+        "shortname": ["ОФЗ 26238", "Газпнф 4P"],
+        "facevalue": [1000.0, 1000.0],
+    })
+
+
+def test_delta_of_unchanged_refresh_is_empty(tmp_path):
+    save_snapshot(_listing(), "bonds", "2026-10-16", root=tmp_path)
+    diff = save_snapshot(_listing(), "bonds", "2026-10-17", root=tmp_path)
+    assert diff.empty
+
+    delta = load_delta("bonds", root=tmp_path)
+    assert delta.empty
+    assert list(delta.columns) == list(load_snapshot("bonds", root=tmp_path).columns)
+
+    delta = load_delta("bonds", columns=["facevalue"], root=tmp_path)
+    assert delta.empty
+    assert list(delta.columns) == ["secid", "facevalue"]
+
+
+def test_delta_reads_only_changed_rows(tmp_path):
+    save_snapshot(_listing(), "bonds", "2026-10-16", root=tmp_path)
+    changed = _listing()
+    changed.loc[1, "facevalue"] = 500.0
+    save_snapshot(changed, "bonds", "2026-10-17", root=tmp_path)
+
+    delta = load_delta("bonds", root=tmp_path)
+    assert list(delta["secid"]) == ["RU000A0JX0J2"]
+    assert delta["facevalue"].tolist() == [500.0]